@@ -0,0 +1,75 @@
+"""Benchmark of the connected components of the graph in the window.
+Compares the incremental ComponentTracker with a breadth first search
+of the whole graph after each transaction.
+
+usage:
+    python benchmarks/bench_components.py [<venmo-trans.txt> [<max lines>]]
+"""
+import sys, os
+import time
+basepath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(basepath, '..', 'src'))
+
+from components import ComponentTracker
+from interner import NameInterner
+from opsstorage import OpsStorage
+from venmograph import VenmoGraph
+import rolling_median
+
+def bfs_components(graph):
+    """returns the number of components and the size of the largest one"""
+    seen = set()
+    count = largest = 0
+    for start in graph.graph:
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = [start]
+        for node in queue:
+            for neighbor in graph.graph[node]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        count += 1
+        largest = max(largest, len(queue))
+    return count, largest
+
+def run(path, max_lines, incremental):
+    """returns the time spent computing the components and the results"""
+    ops = OpsStorage(NameInterner())
+    graph = VenmoGraph()
+    if incremental:
+        components = ComponentTracker()
+        graph.add_observer(components)
+    elapsed = 0
+    results = []
+    with open(path) as f:
+        for _, transactions in rolling_median.iter_json_transactions(f, ops):
+            for _, timestamp, message in transactions[:max_lines - len(results)]:
+                new_messages, obsolete_messages = ops.add(message, timestamp)
+                start = time.time()
+                graph.update(new_messages, obsolete_messages, timestamp)
+                if incremental:
+                    results.append((components.count, components.largest()))
+                else:
+                    results.append(bfs_components(graph))
+                elapsed += time.time() - start
+            if len(results) == max_lines:
+                break
+    return elapsed, results
+
+if __name__ == '__main__':
+    path = os.path.join(basepath, '..', 'data-gen', 'venmo-trans.txt')
+    max_lines = 20000
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    if len(sys.argv) > 2:
+        max_lines = int(sys.argv[2])
+    expected = None
+    for name, incremental in [('bfs', False), ('incremental', True)]:
+        elapsed, results = run(path, max_lines, incremental)
+        print '{:12} {:8.3f}s {:10.0f} lines/s'.format(name, elapsed, len(results) / elapsed)
+        if expected is None:
+            expected = results
+        elif results != expected:
+            print 'the results are different'
@@ -0,0 +1,35 @@
+"""Peak memory comparison of the graph stores.
+Runs rolling_median.main in a separate process for each graph store
+and reports the time and the peak resident set size.
+
+usage:
+    python performance_test_generator.py 1000000 > /tmp/perf.txt
+    python benchmarks/bench_graph_memory.py /tmp/perf.txt
+"""
+import sys, os
+import resource
+import subprocess
+import time
+basepath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(basepath, '..', 'src'))
+
+def run(graph, path):
+    """runs main in this process and prints the peak RSS in MB"""
+    import rolling_median
+    with open(path) as input_stream:
+        with open(os.devnull, 'w') as output_stream:
+            rolling_median.main(input_stream, output_stream,
+                VenmoGraphClass=rolling_median.GRAPH_CLASSES[graph])
+    # ru_maxrss is in KB on Linux
+    print resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--run':
+        run(sys.argv[2], sys.argv[3])
+        sys.exit()
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    for graph in ['dict', 'compact']:
+        start = time.time()
+        rss = subprocess.check_output([sys.executable, __file__, '--run', graph, sys.argv[1]])
+        print '{:8} {:8.2f}s peak RSS {:8.1f}MB'.format(graph, time.time() - start, float(rss))
@@ -0,0 +1,46 @@
+"""Benchmark of the input decoding done by rolling_median.main.
+Compares the decoding with json.loads of each line read from the file
+with the block reading and bulk decoding of the ingestion module.
+
+usage:
+    python benchmarks/bench_ingestion.py [<venmo-trans.txt>]
+"""
+import sys, os
+import json
+import time
+basepath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(basepath, '..', 'src'))
+
+import ingestion
+
+def per_line(path):
+    count = 0
+    with open(path) as f:
+        for line in f:
+            try:
+                json.loads(line)
+            except ValueError:
+                continue
+            count += 1
+    return count
+
+def blocks(path):
+    count = 0
+    with open(path) as f:
+        for lines in ingestion.iter_blocks(f):
+            count += sum(1 for m in ingestion.decode_lines(lines) if m is not None)
+    return count
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        path = sys.argv[1]
+    else:
+        path = os.path.join(basepath, '..', 'data-gen', 'venmo-trans.txt')
+    results = {}
+    for name, func in [('per-line', per_line), ('blocks', blocks)]:
+        start = time.time()
+        count = func(path)
+        results[name] = time.time() - start
+        print '{:10} {:8.3f}s {:10.0f} lines/s ({} decoded)'.format(
+            name, results[name], count / results[name], count
+        )
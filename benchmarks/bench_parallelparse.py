@@ -0,0 +1,57 @@
+"""Benchmark of the decoding of the input in a pool of worker processes (src/parallelparse.py).
+Compares, in lines per second, the decoding and validation of the json blocks in the main process
+with the pool of each number of processes, first alone and then in a whole run of rolling_median.main.
+The speedup depends on the cores available: with a single core the pool is only an overhead.
+
+usage:
+    python benchmarks/bench_parallelparse.py [<venmo-trans.txt> [<processes>...]]
+"""
+import sys, os
+import time
+basepath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(basepath, '..', 'src'))
+
+import rolling_median
+from ingestion import BLOCK_SIZE
+from opsstorage import OpsStorage
+from parallelparse import iter_parallel_transactions
+
+class _NullOutput(object):
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+def decode(path, processes):
+    """returns the number of valid transactions"""
+    count = 0
+    with open(path) as f:
+        if processes:
+            blocks = iter_parallel_transactions(f, processes, BLOCK_SIZE)
+        else:
+            blocks = rolling_median.iter_json_transactions(f, OpsStorage())
+        for _, transactions in blocks:
+            count += len(transactions)
+    return count
+
+def run(path, processes):
+    with open(path) as f:
+        rolling_median.main(f, _NullOutput(), processes=processes)
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(basepath, '..', 'data-gen', 'venmo-trans.txt')
+    process_counts = [int(p) for p in sys.argv[2:]] or [1, 2, 4]
+    with open(path) as f:
+        lines = sum(1 for _ in f)
+    for name, func in [('decode', decode), ('main', run)]:
+        baseline = None
+        for processes in [0] + process_counts:
+            start = time.time()
+            func(path, processes)
+            elapsed = time.time() - start
+            if baseline is None:
+                baseline = elapsed
+            print '{:6} {:2} processes {:8.3f}s {:10.0f} lines/s {:5.2f}x'.format(
+                name, processes, elapsed, lines / elapsed, baseline / elapsed
+            )
@@ -0,0 +1,92 @@
+"""Load test of the streaming service (src/streamservice.py) with local fake producers.
+Each producer sends its transactions in chunks as fast as the service accepts them
+(the latency is then mostly the time spent in the full queues) or at a given rate,
+a subscriber counts the output lines. Every transaction has an output line and the service
+processes them in the order they are queued, so the c-th output line is received after
+the first c transactions are sent: the latency of a chunk is the time from its sending to
+the reception of as many output lines as the transactions sent until then.
+
+usage:
+    python benchmarks/bench_streamservice.py [<producers> [<transactions per producer> [<transactions per second of each producer>]]]
+"""
+import sys, os
+import json
+import time
+import socket
+import threading
+basepath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(basepath, '..', 'src'))
+
+from metrics import LatencyHistogram
+from streamservice import StreamService
+
+CHUNK = 100
+
+def transactions(producer, count):
+    """lines of a producer, with timestamps one second apart every 50 transactions"""
+    for i in xrange(count):
+        seconds = 1459207380 + i / 50
+        yield '{{"created_time": "{}", "target": "user-{}-{}", "actor": "user-{}"}}\n'.format(
+            time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds)), producer, i % 97, (i * 7) % 131
+        )
+
+def run(producers, count, rate=None):
+    service = StreamService(0, 0)
+    service.start()
+    subscriber = socket.create_connection(service.subscriber_address)
+    while not len(service.subscribers):
+        time.sleep(0.01)
+    # (<time>, <transactions sent until then>) of each chunk and time of each received line
+    sent = []
+    sent_lock = threading.Lock()
+    received = []
+    total = producers * count
+
+    def produce(producer):
+        connection = socket.create_connection(service.producer_address)
+        lines = list(transactions(producer, count))
+        begin = time.time()
+        for start in xrange(0, count, CHUNK):
+            if rate:
+                delay = begin + float(start) / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            connection.sendall(''.join(lines[start:start + CHUNK]))
+            with sent_lock:
+                sent.append((time.time(), (sent[-1][1] if sent else 0) + len(lines[start:start + CHUNK])))
+        connection.close()
+
+    def subscribe():
+        while len(received) < total:
+            data = subscriber.recv(1 << 16)
+            if not data:
+                break
+            now = time.time()
+            received.extend([now] * data.count('\n'))
+
+    start = time.time()
+    threads = [threading.Thread(target=produce, args=(p,)) for p in xrange(producers)]
+    threads.append(threading.Thread(target=subscribe))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    service.stop()
+    latency = LatencyHistogram()
+    for sent_time, sent_count in sent:
+        latency.add(received[sent_count - 1] - sent_time)
+    summary = latency.summary()
+    return {
+        'producers': producers,
+        'transactions': len(received),
+        'transactions_per_second': len(received) / (received[-1] - start),
+        'latency_p50': summary['p50'],
+        'latency_p99': summary['p99'],
+        'latency_max': summary['max']
+    }
+
+if __name__ == '__main__':
+    producers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    print json.dumps(run(producers, count, rate), sort_keys=True)
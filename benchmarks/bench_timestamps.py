@@ -0,0 +1,62 @@
+"""Benchmark of the created_time parsing done by OpsStorage.
+Compares the strptime based conversion with the fast parser and the cached
+conversion of an OpsStorage instance on the timestamps of an input file.
+
+usage:
+    python benchmarks/bench_timestamps.py [<venmo-trans.txt>]
+"""
+import sys, os
+import json
+import timeit
+basepath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(basepath, '..', 'src'))
+
+import opsstorage
+
+def load_timestamps(path):
+    timestamps = []
+    with open(path) as f:
+        for line in f:
+            try:
+                timestamps.append(json.loads(line)['created_time'])
+            except (ValueError, KeyError):
+                continue
+    return timestamps
+
+def run(timestamps, repeat=3):
+    storage = opsstorage.OpsStorage()
+    def strict():
+        for t in timestamps:
+            try:
+                opsstorage._strict_seconds_since_epoch(t)
+            except opsstorage.OpsStorageException:
+                pass
+    def fast():
+        for t in timestamps:
+            try:
+                opsstorage.seconds_since_epoch(t)
+            except opsstorage.OpsStorageException:
+                pass
+    def cached():
+        for t in timestamps:
+            try:
+                storage._seconds_since_epoch(t)
+            except opsstorage.OpsStorageException:
+                pass
+    results = {}
+    for name, func in [('strptime', strict), ('fast', fast), ('cached', cached)]:
+        results[name] = min(timeit.repeat(func, number=1, repeat=repeat))
+    return results
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        path = sys.argv[1]
+    else:
+        path = os.path.join(basepath, '..', 'data-gen', 'venmo-trans.txt')
+    timestamps = load_timestamps(path)
+    results = run(timestamps)
+    for name in ['strptime', 'fast', 'cached']:
+        print '{:10} {:8.3f}s {:8.2f}us/timestamp {:6.1f}x'.format(
+            name, results[name], results[name] / len(timestamps) * 1e6,
+            results['strptime'] / results[name]
+        )
@@ -0,0 +1,121 @@
+"""Benchmark of the median trackers on the scenarios of benchmarks/workloads.py.
+rolling_median.main runs once for each scenario and tracker, in a separate process so that
+the peak memory of each run is measured on its own. The lines are processed one at a time (block size 0),
+and the latency of a line is the time between the writes of two consecutive medians.
+The result of each run is a json line with the lines per second, the latency percentiles in seconds,
+the peak resident memory in KB (including the interpreter, the input lines are generated while they are read)
+and a checksum of the output, that is the same for all the trackers of a scenario.
+A run that fails has an "error" field with the traceback or the exit code of its process instead of the measures.
+The baseline is SimpleMedianTracker (unit_tests/tracker_util.py), that keeps a sorted list of the degrees.
+
+usage:
+    python benchmarks/bench_trackers.py [--lines <lines>] [--scenario <scenario>]... [--tracker <tracker>]...
+"""
+import sys, os
+import json
+import time
+import hashlib
+import Queue
+import argparse
+import resource
+import traceback
+import multiprocessing
+basepath = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(basepath, '..', 'src'))
+sys.path.append(os.path.join(basepath, '..', 'unit_tests'))
+
+from metrics import LatencyHistogram
+import rolling_median
+from tracker_util import SimpleMedianTracker
+from workloads import SCENARIOS
+
+TRACKER_CLASSES = dict(rolling_median.TRACKER_CLASSES, simple=SimpleMedianTracker)
+
+class _TimedOutput(object):
+    """output stream recording the time between two writes"""
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.digest = hashlib.md5()
+        self.last = time.time()
+
+    def write(self, text):
+        now = time.time()
+        self.latency.add(now - self.last)
+        self.last = now
+        self.digest.update(text)
+
+    def flush(self):
+        pass
+
+def run(scenario, tracker, lines):
+    """returns the result of rolling_median.main on the scenario with the tracker"""
+    # read one line at a time, the whole input is never in memory
+    input_lines = (line + '\n' for line in SCENARIOS[scenario](lines))
+    output = _TimedOutput()
+    start = output.last = time.time()
+    rolling_median.main(input_lines, output, MedianTrackerClass=TRACKER_CLASSES[tracker], block_size=0)
+    elapsed = time.time() - start
+    latency = output.latency.summary()
+    return {
+        'scenario': scenario,
+        'tracker': tracker,
+        'lines': lines,
+        'seconds': elapsed,
+        'lines_per_second': lines / elapsed,
+        'latency_p50': latency['p50'],
+        'latency_p99': latency['p99'],
+        'latency_max': latency['max'],
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'output_md5': output.digest.hexdigest()
+    }
+
+def _failed(scenario, tracker, lines, error):
+    return {'scenario': scenario, 'tracker': tracker, 'lines': lines, 'error': error}
+
+def _run_process(results, scenario, tracker, lines):
+    try:
+        result = run(scenario, tracker, lines)
+    except Exception:
+        result = _failed(scenario, tracker, lines, traceback.format_exc())
+    results.put(result)
+
+def run_process(scenario, tracker, lines):
+    """same as run in a new process"""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_process, args=(results, scenario, tracker, lines))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except Queue.Empty:
+            if process.is_alive():
+                continue
+        # the process may have exited just after sending its result
+        try:
+            result = results.get(timeout=1)
+        except Queue.Empty:
+            result = _failed(scenario, tracker, lines, 'the process exited with code {}'.format(process.exitcode))
+        break
+    process.join()
+    return result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of the median trackers.')
+    parser.add_argument('--lines', type=int, default=20000, help='lines of each scenario')
+    parser.add_argument('--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS),
+        help='scenario to run, repeat the option for more scenarios (default all)')
+    parser.add_argument('--tracker', action='append', dest='trackers', choices=sorted(TRACKER_CLASSES),
+        help='tracker to run, repeat the option for more trackers (default all)')
+    args = parser.parse_args()
+    failed = False
+    for scenario in args.scenarios or sorted(SCENARIOS):
+        for tracker in args.trackers or sorted(TRACKER_CLASSES):
+            result = run_process(scenario, tracker, args.lines)
+            if 'error' in result:
+                sys.stderr.write('{} with {} failed:\n{}\n'.format(scenario, tracker, result['error']))
+                failed = True
+            print json.dumps(result, sort_keys=True)
+            sys.stdout.flush()
+    if failed:
+        sys.exit(1)
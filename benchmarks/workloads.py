@@ -0,0 +1,108 @@
+"""Generators of the input of rolling_median for the benchmarks, one for each scenario:
+    power_law     users chosen with a power law, a few hub users have most of the transactions
+    out_of_order  transactions arriving up to 90 seconds late, many of them older than the window
+    bursty        bursts of hundreds of transactions in the same second separated by quiet seconds
+    time_jumps    groups of transactions separated by forward jumps of hours, that clear the window
+    churn         a long stream in which most users appear only in a few transactions
+Each generator yields count json lines and is deterministic for a given seed.
+
+usage:
+    python benchmarks/workloads.py <scenario> [<lines> [<seed>]] > venmo-trans.txt
+"""
+import sys
+import json
+import time
+import random
+
+START = 1459207380
+
+class _Timestamps(object):
+    """formats the timestamps, memoizing the last one"""
+    def __init__(self):
+        self.seconds = None
+        self.text = None
+
+    def format(self, seconds):
+        if seconds != self.seconds:
+            self.seconds = seconds
+            self.text = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+        return self.text
+
+def _line(created_time, actor, target):
+    return json.dumps({'created_time': created_time, 'actor': actor, 'target': target})
+
+def _pair(choose):
+    """an actor and a different target"""
+    actor = choose()
+    target = choose()
+    while target == actor:
+        target = choose()
+    return 'user-{}'.format(actor), 'user-{}'.format(target)
+
+def power_law(count, seed=0):
+    rand = random.Random(seed)
+    users = max(count / 10, 10)
+    # the index of a user follows a pareto distribution, low indexes are the hubs
+    choose = lambda: min(int(rand.paretovariate(1.2)) - 1, users - 1)
+    timestamps = _Timestamps()
+    for i in xrange(count):
+        yield _line(timestamps.format(START + i / 20), *_pair(choose))
+
+def out_of_order(count, seed=0):
+    rand = random.Random(seed)
+    users = max(count / 20, 10)
+    choose = lambda: rand.randrange(users)
+    timestamps = _Timestamps()
+    for i in xrange(count):
+        seconds = START + i / 20 - int(rand.expovariate(1.0 / 30)) % 90
+        yield _line(timestamps.format(seconds), *_pair(choose))
+
+def bursty(count, seed=0):
+    rand = random.Random(seed)
+    users = max(count / 20, 10)
+    choose = lambda: rand.randrange(users)
+    timestamps = _Timestamps()
+    seconds = START
+    burst = 0
+    for i in xrange(count):
+        if not burst:
+            seconds += rand.randint(1, 5)
+            burst = rand.randint(100, 800)
+        burst -= 1
+        yield _line(timestamps.format(seconds), *_pair(choose))
+
+def time_jumps(count, seed=0):
+    rand = random.Random(seed)
+    users = max(count / 20, 10)
+    choose = lambda: rand.randrange(users)
+    timestamps = _Timestamps()
+    seconds = START
+    for i in xrange(count):
+        if i % 1000 == 999:
+            seconds += rand.randint(3600, 86400)
+        elif i % 10 == 0:
+            seconds += 1
+        yield _line(timestamps.format(seconds), *_pair(choose))
+
+def churn(count, seed=0):
+    rand = random.Random(seed)
+    timestamps = _Timestamps()
+    for i in xrange(count):
+        # users are active for about 1000 transactions, so the window always has new ones
+        yield _line(timestamps.format(START + i / 20), *_pair(lambda: rand.randrange(i, i + 1000)))
+
+SCENARIOS = {
+    'power_law': power_law,
+    'out_of_order': out_of_order,
+    'bursty': bursty,
+    'time_jumps': time_jumps,
+    'churn': churn
+}
+
+if __name__ == '__main__':
+    if not 2 <= len(sys.argv) <= 4 or sys.argv[1] not in SCENARIOS:
+        sys.exit(__doc__)
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    for line in SCENARIOS[sys.argv[1]](lines, seed):
+        print line
@@ -0,0 +1,76 @@
+"""Snapshots of the streaming state of rolling_median.
+A checkpoint contains the name interner, the OpsStorage and VenmoGraph of each window
+and the degree counts of each tracker, together with the input and output byte offsets
+covered by the snapshot.
+The trackers are rebuilt from the degree counts, so both the size of a checkpoint and
+the time to restore it are proportional to the transactions in the window.
+"""
+import os
+import cPickle as pickle
+
+VERSION = 2
+
+class CheckpointException(Exception):
+    pass
+
+def snapshot(interner, stacks, input_offset, output_offset):
+    """returns the checkpoint of the state of rolling_median.main"""
+    return {
+        'version': VERSION,
+        'input_offset': input_offset,
+        'output_offset': output_offset,
+        'interner': interner,
+        'stacks': [
+            (ops, graph, _live_degrees(tracker.degrees))
+            for ops, graph, tracker in stacks
+        ]
+    }
+
+def restore(checkpoint, MedianTrackerClass):
+    """returns the interner and the (OpsStorage, VenmoGraph, tracker) stacks of a checkpoint"""
+    if checkpoint.get('version') != VERSION:
+        raise CheckpointException('unknown checkpoint version {}'.format(checkpoint.get('version')))
+    stacks = [
+        (ops, graph, rebuild_tracker(MedianTrackerClass, degrees))
+        for ops, graph, degrees in checkpoint['stacks']
+    ]
+    return checkpoint['interner'], stacks
+
+def rebuild_tracker(MedianTrackerClass, degrees):
+    """creates a tracker with the given degree counts.
+    Trackers that can be built directly from the degree counts have the from_degrees class method.
+    For the others each node is created and then increased to its degree, the number of updates
+    is the sum of the degrees (twice the number of edges).
+    """
+    from_degrees = getattr(MedianTrackerClass, 'from_degrees', None)
+    if from_degrees is not None:
+        return from_degrees(degrees)
+    tracker = MedianTrackerClass()
+    for degree, count in sorted(degrees.iteritems()):
+        for _ in xrange(count):
+            tracker.receive((0, 1))
+            for d in xrange(1, degree):
+                tracker.receive((d, d + 1))
+    return tracker
+
+def _live_degrees(degrees):
+    # MedianTracker counts the two fake nodes with degree 0 and infinite
+    return dict((d, c) for d, c in degrees.iteritems() if 0 < d < float('inf'))
+
+def save(path, checkpoint):
+    """writes the checkpoint atomically, replacing the previous one"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmp_path, path)
+
+def load(path):
+    """reads the checkpoint in path, returns None if there isn't one"""
+    try:
+        f = open(path, 'rb')
+    except IOError:
+        return None
+    with f:
+        return pickle.load(f)
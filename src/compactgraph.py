@@ -0,0 +1,104 @@
+from venmograph import VenmoGraph, VenmoException
+
+class CompactVenmoGraph(VenmoGraph):
+    """VenmoGraph that uses less memory for the nodes with few neighbors.
+    The neighbors of a node with degree up to INLINE_DEGREE are stored inline in a flat list
+    [<neighbor>, <count>, <neighbor>, <count>, ...] instead of a dictionary.
+    When the degree grows above INLINE_DEGREE the list is replaced by a dictionary {<neighbor>: <count>},
+    that is turned back into a list when the degree goes down to INLINE_DEGREE / 2.
+    Most nodes have degree 1 or 2, and a list of 2 or 4 elements is about a third of an empty dictionary.
+
+    The update method is the same as in VenmoGraph.
+    Use the neighbors method to get the neighbors of a node as a dictionary.
+    """
+
+    INLINE_DEGREE = 4
+
+    def degree(self, node):
+        """returns the number of neighbors of node, 0 if it is not in the graph."""
+        neighbors = self.graph.get(node)
+        if neighbors is None:
+            return 0
+        if type(neighbors) is list:
+            return len(neighbors) >> 1
+        return len(neighbors)
+
+    def has_edge(self, node, neighbor):
+        """returns True if there is at least one transaction between node and neighbor."""
+        neighbors = self.graph.get(node, ())
+        if type(neighbors) is list:
+            return neighbor in neighbors[::2]
+        return neighbor in neighbors
+
+    @staticmethod
+    def _neighbors_degree(neighbors):
+        if type(neighbors) is list:
+            return len(neighbors) >> 1
+        return len(neighbors)
+
+    def neighbors(self, node):
+        """returns the neighbors of node as a {<neighbor>: <transaction count>} dictionary."""
+        neighbors = self.graph.get(node, {})
+        if type(neighbors) is list:
+            return dict(zip(neighbors[::2], neighbors[1::2]))
+        return dict(neighbors)
+
+    def _handle_obsolete(self, node, neighbor, obsolete=1):
+        """handle "obsolete" obsolete messages by updating/deleting the node neighbor.
+        """
+        neighbors = self.graph[node]
+        if type(neighbors) is list:
+            for i in xrange(0, len(neighbors), 2):
+                if neighbors[i] == neighbor:
+                    break
+            else:
+                raise VenmoException('{} does not have {} as neighbor'.format(node, neighbor))
+            count = neighbors[i + 1]
+            if count == obsolete:
+                del neighbors[i:i + 2]
+                if not neighbors:
+                    self.graph.pop(node)
+            elif count > obsolete:
+                neighbors[i + 1] = count - obsolete
+            else:
+                raise VenmoException('{} does not have {} transactions with {}'.format(node, obsolete, neighbor))
+            return
+        try:
+            count = neighbors[neighbor]
+        except KeyError:
+            raise VenmoException('{} does not have {} as neighbor'.format(node, neighbor))
+        if count == obsolete:
+            neighbors.pop(neighbor)
+            if len(neighbors) <= self.INLINE_DEGREE / 2:
+                inline = []
+                for item in neighbors.iteritems():
+                    inline.extend(item)
+                if inline:
+                    self.graph[node] = inline
+                else:
+                    self.graph.pop(node)
+        elif count > obsolete:
+            neighbors[neighbor] = count - obsolete
+        else:
+            raise VenmoException('{} does not have {} transactions with {}'.format(node, obsolete, neighbor))
+
+    def _handle_new(self, node, neighbor):
+        """add/update a node neighbor.
+        """
+        neighbors = self.graph.get(node)
+        if neighbors is None:
+            self.graph[node] = [neighbor, 1]
+        elif type(neighbors) is list:
+            for i in xrange(0, len(neighbors), 2):
+                if neighbors[i] == neighbor:
+                    neighbors[i + 1] += 1
+                    return
+            if len(neighbors) < 2 * self.INLINE_DEGREE:
+                # a new list of the exact size, append would over-allocate
+                self.graph[node] = neighbors + [neighbor, 1]
+            else:
+                neighbors = dict(zip(neighbors[::2], neighbors[1::2]))
+                neighbors[neighbor] = 1
+                self.graph[node] = neighbors
+        else:
+            neighbors[neighbor] = neighbors.get(neighbor, 0) + 1
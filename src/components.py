@@ -0,0 +1,342 @@
+import bisect
+
+class ComponentException(Exception):
+    pass
+
+class ComponentTracker(object):
+    """Class that tracks the connected components of the graph in the sliding window,
+    an observer of VenmoGraph (see VenmoGraph.add_observer).
+
+    The tracker keeps a spanning forest of the graph in a link-cut tree, in which each edge has the timestamp
+    of its latest transaction as weight. The forest is a maximum spanning forest:
+    when an edge closes a cycle, it replaces the oldest edge of the cycle if it is newer.
+    The transactions leave the window in timestamp order, so the edges removed by an update are older
+    than all the remaining ones: a removed edge of the forest can't have a replacement
+    (it would be newer, and would have replaced it) and removing it splits its component in two.
+    Both adding and removing an edge take O(log(#nodes)) amortized.
+
+    The link-cut tree also keeps the number of graph nodes of each tree (including the virtual subtrees),
+    the component sizes are kept in the dictionary "sizes" ({<size>: <number of components>})
+    and, sorted, in "occupied_sizes", as the degrees in MedianTracker.
+
+    The link-cut tree is stored in lists indexed by slot (slot 0 is the empty node):
+    each graph node and each edge of the forest has a slot, freed slots are reused.
+    """
+
+    def __init__(self):
+        # number of connected components
+        self.count = 0
+        self.sizes = {}
+        self.occupied_sizes = []
+        # <node>: slot
+        self.nodes = {}
+        # (<node>, <neighbor>): [<timestamp>, <slot if the edge is in the forest or 0>]
+        self.edges = {}
+        self.left = [0]
+        self.right = [0]
+        self.parent = [0]
+        self.reversed = [False]
+        # weight of the slot: the edge timestamp, infinite for the graph nodes
+        self.weight = [float('inf')]
+        # slot with the minimum weight in the splay subtree
+        self.minimum = [0]
+        # number of graph nodes in the splay subtree and in the virtual subtrees
+        self.size = [0]
+        self.virtual_size = [0]
+        # 1 for graph nodes, 0 for edges
+        self.own_size = [0]
+        # the two node slots of each edge slot
+        self.ends = [None]
+        self.free_slots = []
+
+    def largest(self):
+        """returns the size of the largest component, 0 if there are no nodes"""
+        if not self.occupied_sizes:
+            return 0
+        return self.occupied_sizes[-1]
+
+    def clear(self):
+        """removes all the nodes and edges."""
+        self.__init__()
+
+    def receive_degrees(self, node_degrees):
+        """receives a list of (<node>, <degree_before>, <degree_after>): the nodes without edges are removed."""
+        for node, degree_before, degree_after in node_degrees:
+            if degree_before and not degree_after:
+                self._remove_node(node)
+            elif degree_after and not degree_before:
+                self._node_slot(node)
+
+    def receive_edges(self, new_edges, removed_edges):
+        """receives the (<node>, <neighbor>, <timestamp>) of new transactions and
+        the (<node>, <neighbor>) of the edges removed from the graph.
+        """
+        for node, neighbor in removed_edges:
+            self.remove_edge(node, neighbor)
+        for node, neighbor, timestamp in new_edges:
+            self.add_edge(node, neighbor, timestamp)
+
+    def add_edge(self, node, neighbor, timestamp):
+        """adds a transaction between node and neighbor, creating the edge if it doesn't exist."""
+        key = (node, neighbor) if node <= neighbor else (neighbor, node)
+        edge = self.edges.get(key)
+        if edge is not None:
+            if timestamp <= edge[0]:
+                return
+            edge[0] = timestamp
+            slot = edge[1]
+            if slot:
+                # a newer edge of the forest is still in a maximum spanning forest
+                self._splay(slot)
+                self.weight[slot] = timestamp
+                self._pull(slot)
+                return
+        else:
+            edge = self.edges[key] = [timestamp, 0]
+        u = self._node_slot(node)
+        v = self._node_slot(neighbor)
+        if u == v:
+            return
+        if self._find_root(u) != self._find_root(v):
+            self._remove_size(self._tree_size(u))
+            self._remove_size(self._tree_size(v))
+            self._link_edge(edge, key, u, v)
+            self._add_size(self._tree_size(u))
+            self.count -= 1
+            return
+        self._make_root(u)
+        self._access(v)
+        oldest = self.minimum[v]
+        if self.weight[oldest] < timestamp:
+            old_u, old_v, old_key = self.ends[oldest]
+            self._cut_edge(oldest, old_u, old_v)
+            self.edges[old_key][1] = 0
+            self._link_edge(edge, key, u, v)
+
+    def remove_edge(self, node, neighbor):
+        """removes the edge between node and neighbor, if there is one."""
+        key = (node, neighbor) if node <= neighbor else (neighbor, node)
+        edge = self.edges.pop(key, None)
+        if edge is None or not edge[1]:
+            return
+        slot = edge[1]
+        u, v, _ = self.ends[slot]
+        self._remove_size(self._tree_size(u))
+        self._cut_edge(slot, u, v)
+        self._add_size(self._tree_size(u))
+        self._add_size(self._tree_size(v))
+        self.count += 1
+
+    def component_size(self, node):
+        """returns the number of nodes in the component of node, 0 if node is not in the graph."""
+        slot = self.nodes.get(node)
+        if slot is None:
+            return 0
+        return self._tree_size(slot)
+
+    def _node_slot(self, node):
+        slot = self.nodes.get(node)
+        if slot is None:
+            slot = self.nodes[node] = self._new_slot(float('inf'), 1)
+            self._add_size(1)
+            self.count += 1
+        return slot
+
+    def _remove_node(self, node):
+        slot = self.nodes.pop(node, None)
+        if slot is None:
+            return
+        if self._tree_size(slot) != 1:
+            raise ComponentException('{} still has edges'.format(node))
+        self._remove_size(1)
+        self.count -= 1
+        self.free_slots.append(slot)
+
+    def _add_size(self, size):
+        count = self.sizes.get(size, 0)
+        if not count:
+            bisect.insort(self.occupied_sizes, size)
+        self.sizes[size] = count + 1
+
+    def _remove_size(self, size):
+        count = self.sizes[size]
+        if count == 1:
+            del self.sizes[size]
+            del self.occupied_sizes[bisect.bisect_left(self.occupied_sizes, size)]
+        else:
+            self.sizes[size] = count - 1
+
+    def _new_slot(self, weight, own_size):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.left[slot] = self.right[slot] = self.parent[slot] = 0
+            self.reversed[slot] = False
+            self.weight[slot] = weight
+            self.minimum[slot] = slot
+            self.size[slot] = own_size
+            self.virtual_size[slot] = 0
+            self.own_size[slot] = own_size
+            self.ends[slot] = None
+            return slot
+        slot = len(self.left)
+        self.left.append(0)
+        self.right.append(0)
+        self.parent.append(0)
+        self.reversed.append(False)
+        self.weight.append(weight)
+        self.minimum.append(slot)
+        self.size.append(own_size)
+        self.virtual_size.append(0)
+        self.own_size.append(own_size)
+        self.ends.append(None)
+        return slot
+
+    def _link_edge(self, edge, key, u, v):
+        """adds an edge slot between the node slots u and v, that are in different trees."""
+        slot = self._new_slot(edge[0], 0)
+        self.ends[slot] = (u, v, key)
+        edge[1] = slot
+        self._link(u, slot)
+        self._link(slot, v)
+
+    def _cut_edge(self, slot, u, v):
+        self._cut(u, slot)
+        self._cut(slot, v)
+        self.free_slots.append(slot)
+
+    # link-cut tree operations
+
+    def _is_root(self, x):
+        """True if x is the root of its splay tree"""
+        p = self.parent[x]
+        return p == 0 or (self.left[p] != x and self.right[p] != x)
+
+    def _push(self, x):
+        if self.reversed[x]:
+            left = self.left
+            right = self.right
+            l = left[x]
+            r = right[x]
+            left[x] = r
+            right[x] = l
+            if l:
+                self.reversed[l] = not self.reversed[l]
+            if r:
+                self.reversed[r] = not self.reversed[r]
+            self.reversed[x] = False
+
+    def _pull(self, x):
+        l = self.left[x]
+        r = self.right[x]
+        weight = self.weight
+        minimum = self.minimum
+        m = x
+        if l and weight[minimum[l]] < weight[m]:
+            m = minimum[l]
+        if r and weight[minimum[r]] < weight[m]:
+            m = minimum[r]
+        minimum[x] = m
+        size = self.size
+        size[x] = size[l] + size[r] + self.virtual_size[x] + self.own_size[x]
+
+    def _rotate(self, x):
+        left = self.left
+        right = self.right
+        parent = self.parent
+        p = parent[x]
+        g = parent[p]
+        if not self._is_root(p):
+            if left[g] == p:
+                left[g] = x
+            else:
+                right[g] = x
+        parent[x] = g
+        if left[p] == x:
+            b = right[x]
+            left[p] = b
+            right[x] = p
+        else:
+            b = left[x]
+            right[p] = b
+            left[x] = p
+        if b:
+            parent[b] = p
+        parent[p] = x
+        self._pull(p)
+        self._pull(x)
+
+    def _splay(self, x):
+        path = [x]
+        y = x
+        while not self._is_root(y):
+            y = self.parent[y]
+            path.append(y)
+        for y in reversed(path):
+            self._push(y)
+        left = self.left
+        parent = self.parent
+        while not self._is_root(x):
+            p = parent[x]
+            if not self._is_root(p):
+                g = parent[p]
+                if (left[g] == p) == (left[p] == x):
+                    self._rotate(p)
+                else:
+                    self._rotate(x)
+            self._rotate(x)
+
+    def _access(self, x):
+        """makes the path from the root of the tree to x preferred, x becomes the root of its splay tree"""
+        right = self.right
+        size = self.size
+        virtual_size = self.virtual_size
+        last = 0
+        y = x
+        while y:
+            self._splay(y)
+            virtual_size[y] += size[right[y]] - size[last]
+            right[y] = last
+            self._pull(y)
+            last = y
+            y = self.parent[y]
+        self._splay(x)
+
+    def _make_root(self, x):
+        self._access(x)
+        self.reversed[x] = not self.reversed[x]
+        self._push(x)
+
+    def _find_root(self, x):
+        self._access(x)
+        left = self.left
+        while True:
+            self._push(x)
+            if not left[x]:
+                break
+            x = left[x]
+        self._splay(x)
+        return x
+
+    def _tree_size(self, x):
+        """number of graph nodes in the tree of x"""
+        self._access(x)
+        return self.size[x]
+
+    def _link(self, x, y):
+        """links the trees of x and y with the edge x - y"""
+        self._make_root(x)
+        self._access(y)
+        self.parent[x] = y
+        self.virtual_size[y] += self.size[x]
+        self._pull(y)
+
+    def _cut(self, x, y):
+        """removes the edge x - y"""
+        self._make_root(x)
+        self._access(y)
+        self._push(x)
+        if self.left[y] != x or self.right[x]:
+            raise ComponentException('there is no edge between slots {} and {}'.format(x, y))
+        self.left[y] = 0
+        self.parent[x] = 0
+        self._pull(y)
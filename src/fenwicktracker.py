@@ -0,0 +1,149 @@
+from mediantracker import MedianTrackerException
+
+class FenwickMedianTracker(object):
+    """Class that tracks the median of graph degrees with a Fenwick tree (binary indexed tree)
+    of the number of nodes for each degree.
+    It receives the same degree updates of MedianTracker and can be used in its place
+    (see the MedianTrackerClass parameter of rolling_median.main).
+
+    The element i of the tree (1 based) holds the number of nodes with degree in (i - (i & -i), i],
+    so that both a count update and the search of the k-th smallest degree take O(log(max degree)).
+    The median is found by rank from the number of nodes.
+    The memory used is proportional to the largest degree seen, not to the number of nodes:
+    the tree doubles its capacity when a degree doesn't fit.
+
+    The degree counts are also kept in the property "degrees".
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        self.degrees = {}
+        self.size = 0
+        self.tree = [0] * (self.INITIAL_CAPACITY + 1)
+
+    @classmethod
+    def from_degrees(cls, degrees):
+        """creates a tracker from the number of nodes for each degree ({<degree>: <count>})."""
+        tracker = cls()
+        for degree, count in degrees.iteritems():
+            if 0 < degree < float('inf') and count:
+                tracker.degrees[degree] = count
+                tracker.size += count
+        if tracker.degrees:
+            tracker._build(max(tracker.degrees))
+        return tracker
+
+    def clear(self):
+        """removes all the nodes, instead of an update to degree 0 for each of them."""
+        self.__init__()
+
+    def receive(self, update):
+        """Receives and processes one degree update (<old_degree>, <new_degree>).
+        The same updates accepted by MedianTracker.receive are accepted.
+        """
+        degree_before, degree_after = update
+        if degree_before == 0:
+            if degree_after != 1:
+                raise MedianTrackerException('invalid operation {}'.format(update))
+            self.size += 1
+        elif degree_after == 0 or degree_before + 1 == degree_after or degree_before > degree_after:
+            count = self.degrees.get(degree_before, 0)
+            if not count:
+                raise MedianTrackerException('invalid operation {}, there is no node with degree {}'.format(
+                    update, degree_before
+                ))
+            if count == 1:
+                self.degrees.pop(degree_before)
+            else:
+                self.degrees[degree_before] = count - 1
+            self._add(degree_before, -1)
+            if degree_after == 0:
+                self.size -= 1
+                return
+        else:
+            raise MedianTrackerException('invalid operation {}'.format(update))
+        self.degrees[degree_after] = self.degrees.get(degree_after, 0) + 1
+        self._add(degree_after, 1)
+
+    def receive_batch(self, updates):
+        """Receives and processes a list of degree updates, the ones of a single transaction.
+        The updates are merged in the net change of the number of nodes for each degree,
+        so the tree is updated once for each distinct degree.
+        """
+        changes = {}
+        for update in updates:
+            degree_before, degree_after = update
+            if degree_before == 0:
+                if degree_after != 1:
+                    raise MedianTrackerException('invalid operation {}'.format(update))
+                self.size += 1
+            elif degree_after == 0:
+                self.size -= 1
+            elif degree_before + 1 != degree_after and degree_before <= degree_after:
+                raise MedianTrackerException('invalid operation {}'.format(update))
+            if degree_before:
+                changes[degree_before] = changes.get(degree_before, 0) - 1
+            if degree_after:
+                changes[degree_after] = changes.get(degree_after, 0) + 1
+        for degree, change in changes.iteritems():
+            if not change:
+                continue
+            count = self.degrees.get(degree, 0) + change
+            if count < 0:
+                raise MedianTrackerException('invalid operations, there are not {} nodes with degree {}'.format(
+                    -change, degree
+                ))
+            if count:
+                self.degrees[degree] = count
+            else:
+                self.degrees.pop(degree, None)
+            self._add(degree, change)
+
+    def median(self):
+        """method to compute the numeric median"""
+        size = self.size
+        if size == 0:
+            # same as MedianTracker with no nodes
+            return float('inf')
+        if size % 2 == 1:
+            return self._kth(size / 2 + 1)
+        return (self._kth(size / 2) + self._kth(size / 2 + 1)) / 2.0
+
+    def _add(self, degree, delta):
+        """adds delta to the count of degree"""
+        tree = self.tree
+        length = len(tree)
+        if degree >= length:
+            self._build(degree)
+            return
+        while degree < length:
+            tree[degree] += delta
+            degree += degree & -degree
+
+    def _kth(self, k):
+        """returns the k-th smallest degree (1 based)"""
+        tree = self.tree
+        position = 0
+        step = len(tree) - 1
+        while step:
+            next_position = position + step
+            if tree[next_position] < k:
+                position = next_position
+                k -= tree[next_position]
+            step >>= 1
+        return position + 1
+
+    def _build(self, max_degree):
+        """rebuilds the tree from the degree counts with a capacity greater than max_degree"""
+        capacity = len(self.tree) - 1
+        while capacity <= max_degree:
+            capacity *= 2
+        tree = [0] * (capacity + 1)
+        for degree, count in self.degrees.iteritems():
+            tree[degree] += count
+        for i in xrange(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                tree[parent] += tree[i]
+        self.tree = tree
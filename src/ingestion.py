@@ -0,0 +1,77 @@
+import json
+
+BLOCK_SIZE = 1 << 20
+
+# lines containing these fields are invalid unless the key is repeated
+_EMPTY_FIELDS = [('"actor": ""', '"actor"'), ('"target": ""', '"target"')]
+_JSON_WHITESPACE = ' \t\n\r'
+
+def iter_blocks(input_stream, block_size=BLOCK_SIZE):
+    """reads the input stream in blocks of about block_size bytes.
+    Yields the list of complete lines (without the trailing newline) contained in each block.
+    """
+    for lines, _ in iter_terminated_blocks(input_stream, block_size):
+        yield lines
+
+def iter_terminated_blocks(input_stream, block_size=BLOCK_SIZE):
+    """same as iter_blocks, but yields (<lines>, <terminated>) where terminated is False
+    for the last line of the input when it has no newline (the input might have been cut in the middle of it).
+    """
+    remainder = ''
+    while True:
+        block = input_stream.read(block_size)
+        if not block:
+            break
+        lines = (remainder + block).split('\n')
+        remainder = lines.pop()
+        if lines:
+            yield lines, True
+    if remainder:
+        yield [remainder], False
+
+def iter_lines(input_stream):
+    """yields each line of the input stream as a block of a single line.
+    Used when the input is a live stream and every line has to be processed as soon as it arrives.
+    """
+    for line in input_stream:
+        yield [line]
+
+def is_rejected(line):
+    """cheap check for lines that are obviously invalid (eg with an empty actor or target).
+    A False result doesn't mean that the line is valid.
+    """
+    for empty_field, key in _EMPTY_FIELDS:
+        if empty_field in line and line.count(key) == 1:
+            return True
+    return False
+
+def decode_lines(lines):
+    """decodes a list of json lines.
+    Returns the list of messages where invalid or rejected lines are replaced by None.
+    The result is the same as calling json.loads on each line but the C scanner
+    is called directly, skipping the per call overhead of json.loads.
+    """
+    decoder = json.JSONDecoder()
+    scan_once = decoder.scan_once
+    loads = decoder.decode
+    messages = []
+    append = messages.append
+    for line in lines:
+        if is_rejected(line):
+            append(None)
+            continue
+        try:
+            message, end = scan_once(line, 0)
+        except StopIteration:
+            # leading whitespace or invalid json, let the decoder decide
+            try:
+                message = loads(line)
+            except ValueError:
+                message = None
+        except ValueError:
+            message = None
+        else:
+            if end != len(line) and line[end:].strip(_JSON_WHITESPACE):
+                message = None
+        append(message)
+    return messages
@@ -0,0 +1,67 @@
+class InternerException(Exception):
+    pass
+
+class NameInterner(object):
+    """Class that maps user names to dense integer ids.
+    Each id has a reference count, the number of stored transactions in which the user appears.
+    When the count goes to 0 the name is forgotten and its id is reused for the next new name,
+    so the number of ids is bounded by the number of users in the stored transactions.
+
+    The names are only needed again for debugging (see the name method).
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.refcounts = []
+        self.free_ids = []
+
+    def intern(self, name):
+        """returns the id of name and increases its reference count."""
+        node_id = self.ids.get(name)
+        if node_id is not None:
+            self.refcounts[node_id] += 1
+            return node_id
+        if self.free_ids:
+            node_id = self.free_ids.pop()
+            self.names[node_id] = name
+            self.refcounts[node_id] = 1
+        else:
+            node_id = len(self.names)
+            self.names.append(name)
+            self.refcounts.append(1)
+        self.ids[name] = node_id
+        return node_id
+
+    def release(self, node_id):
+        """decreases the reference count of an id, the id is freed when the count goes to 0."""
+        count = self.refcounts[node_id]
+        if count == 1:
+            self.ids.pop(self.names[node_id])
+            self.names[node_id] = None
+            self.refcounts[node_id] = 0
+            self.free_ids.append(node_id)
+        elif count > 1:
+            self.refcounts[node_id] = count - 1
+        else:
+            raise InternerException('id {} is not in use'.format(node_id))
+
+    def references(self):
+        """returns the sum of the reference counts of the ids."""
+        return sum(self.refcounts)
+
+    def clear(self):
+        """forgets all the names and ids at once."""
+        self.ids.clear()
+        del self.names[:]
+        del self.refcounts[:]
+        del self.free_ids[:]
+
+    def name(self, node_id):
+        """returns the name of an id in use."""
+        if not self.refcounts[node_id]:
+            raise InternerException('id {} is not in use'.format(node_id))
+        return self.names[node_id]
+
+    def __len__(self):
+        return len(self.ids)
@@ -1,3 +1,5 @@
+import bisect
+
 class MedianTrackerException(Exception):
     pass
 
@@ -9,8 +11,10 @@ class MedianTracker(object):
     if not it will be point to (degree_above, 0) where degree_above is the next degree above it.
 
     The degree counts and the median elements are stored respectively in the properties "degrees" and "medians".
+    The degrees with at least one node (the fake ones excluded) are also kept sorted in "occupied_degrees",
+    to find the next degree with nodes with a binary search.
 
-    There is only one public instance method, receive, that handles updates to the data structure.
+    The public instance methods receive and receive_batch handle updates to the data structure.
     """
 
     def __init__(self):
@@ -22,6 +26,48 @@ class MedianTracker(object):
             float('inf'): 1
         }
         self.medians = ((0, 0), (float('inf'), 0))
+        self.occupied_degrees = []
+
+    @classmethod
+    def from_degrees(cls, degrees):
+        """creates a tracker from the number of nodes for each degree ({<degree>: <count>}).
+        The linked list is built in a single pass, without moving the median elements.
+        """
+        tracker = cls()
+        size = sum(c for d, c in degrees.iteritems() if 0 < d < float('inf'))
+        if size == 0:
+            return tracker
+        if size % 2 == 0:
+            median_positions = (size / 2 - 1, size / 2)
+        else:
+            median_positions = (size / 2,)
+        linked_list = tracker.nodes_linked_list
+        medians = []
+        prev = (0, 0)
+        position = 0
+        for degree in sorted(degrees):
+            count = degrees[degree]
+            if not 0 < degree < float('inf') or not count:
+                continue
+            tracker.degrees[degree] = count
+            tracker.occupied_degrees.append(degree)
+            for index in xrange(count):
+                node = (degree, index)
+                linked_list[prev]['above'] = node
+                linked_list[node] = {'below': prev}
+                if position in median_positions:
+                    medians.append(node)
+                position += 1
+                prev = node
+        last = (float('inf'), 0)
+        linked_list[prev]['above'] = last
+        linked_list[last]['below'] = prev
+        tracker.medians = tuple(medians)
+        return tracker
+
+    def clear(self):
+        """removes all the nodes, instead of an update to degree 0 for each of them."""
+        self.__init__()
 
     def receive(self, update):
         """Receives and processes one degree update.
@@ -48,11 +94,115 @@ class MedianTracker(object):
         else:
             raise MedianTrackerException('invalid operation {}'.format(update))
 
+    # batches smaller than this are processed one update at a time
+    BATCH_SIZE = 8
+
+    def receive_batch(self, updates):
+        """Receives and processes a list of degree updates, the ones of a single transaction.
+
+        The updates are merged in the net change of the number of nodes for each degree:
+        the nodes of a degree are contiguous in the linked list, so each change unlinks or links
+        a run of nodes at once, and the median elements are found once at the end by rank.
+        The updates are checked as in receive, but they are applied together rather than in order.
+        """
+        if len(updates) < self.BATCH_SIZE:
+            for update in updates:
+                self.receive(update)
+            return
+        changes = {}
+        for update in updates:
+            degree_before, degree_after = update
+            if degree_before == 0:
+                if degree_after != 1:
+                    raise MedianTrackerException('invalid operation {}'.format(update))
+            elif degree_after != 0 and degree_before + 1 != degree_after and degree_before <= degree_after:
+                raise MedianTrackerException('invalid operation {}'.format(update))
+            if degree_before:
+                changes[degree_before] = changes.get(degree_before, 0) - 1
+            if degree_after:
+                changes[degree_after] = changes.get(degree_after, 0) + 1
+        for degree, change in changes.iteritems():
+            if change < 0:
+                self._remove_nodes(degree, -change)
+        for degree, change in changes.iteritems():
+            if change > 0:
+                self._insert_nodes(degree, change)
+        self._find_medians()
+
+    def _remove_nodes(self, degree, count):
+        """removes the last count nodes with degree "degree" from the linked list."""
+        degree_count = self.degrees.get(degree, 0)
+        if degree_count < count:
+            raise MedianTrackerException('cannot remove {} nodes with degree {}, there are {}'.format(
+                count, degree, degree_count
+            ))
+        linked_list = self.nodes_linked_list
+        node_above = linked_list[(degree, degree_count - 1)]['above']
+        node_below = linked_list[(degree, degree_count - count)]['below']
+        linked_list[node_above]['below'] = node_below
+        linked_list[node_below]['above'] = node_above
+        for index in xrange(degree_count - count, degree_count):
+            del linked_list[(degree, index)]
+        if degree_count == count:
+            self.degrees.pop(degree)
+            self._remove_occupied(degree)
+        else:
+            self.degrees[degree] = degree_count - count
+
+    def _insert_nodes(self, degree, count):
+        """appends count nodes with degree "degree" to the linked list."""
+        linked_list = self.nodes_linked_list
+        degree_count = self.degrees.get(degree, 0)
+        if degree_count:
+            prev = (degree, degree_count - 1)
+        else:
+            occupied = self.occupied_degrees
+            position = bisect.bisect_left(occupied, degree)
+            if position:
+                degree_below = occupied[position - 1]
+                prev = (degree_below, self.degrees[degree_below] - 1)
+            else:
+                prev = (0, 0)
+            occupied.insert(position, degree)
+        node_above = linked_list[prev]['above']
+        for index in xrange(degree_count, degree_count + count):
+            node = (degree, index)
+            linked_list[prev]['above'] = node
+            linked_list[node] = {'below': prev}
+            prev = node
+        linked_list[prev]['above'] = node_above
+        linked_list[node_above]['below'] = prev
+        self.degrees[degree] = degree_count + count
+
+    def _find_medians(self):
+        """sets the median elements from the degree counts, walking the distinct degrees in order."""
+        size = sum(self.degrees[degree] for degree in self.occupied_degrees)
+        if size == 0:
+            self.medians = ((0, 0), (float('inf'), 0))
+            return
+        if size % 2 == 0:
+            median_positions = [size / 2 - 1, size / 2]
+        else:
+            median_positions = [size / 2]
+        medians = []
+        position = 0
+        for degree in self.occupied_degrees:
+            count = self.degrees[degree]
+            while median_positions and median_positions[0] < position + count:
+                medians.append((degree, median_positions.pop(0) - position))
+            if not median_positions:
+                break
+            position += count
+        self.medians = tuple(medians)
+
     def _insert_node(self, degree, degree_below, degree_above):
         """insert a new node with degree "degree" between two nodes with "degree_below" and "degree_above".
         Return the node created.
         """
-        self.degrees[degree] = self.degrees.get(degree, 0) + 1
+        count = self.degrees.get(degree, 0)
+        self.degrees[degree] = count + 1
+        if not count:
+            bisect.insort(self.occupied_degrees, degree)
         if degree >= degree_above or degree < degree_below:
             message = """Operation not permitted.
             Cannot insert degreee {} between {} and {}""".format(
@@ -88,13 +238,25 @@ class MedianTracker(object):
         node_below = self.nodes_linked_list[(degree, count - 1)]['below']
         self.nodes_linked_list[node_above]['below'] = node_below
         self.nodes_linked_list[node_below]['above'] = node_above
-        self.nodes_linked_list.pop(degree, count - 1)
+        self.nodes_linked_list.pop((degree, count - 1))
         if count == 1:
             self.degrees.pop(degree)
+            self._remove_occupied(degree)
         else:
             self.degrees[degree] = count - 1
         return (degree, count - 1), node_below, node_above
 
+    def _remove_occupied(self, degree):
+        """removes a degree without nodes from occupied_degrees."""
+        del self.occupied_degrees[bisect.bisect_left(self.occupied_degrees, degree)]
+
+    def _next_occupied(self, degree):
+        """returns the smallest degree with nodes greater than degree, infinite if there is none."""
+        position = bisect.bisect_right(self.occupied_degrees, degree)
+        if position == len(self.occupied_degrees):
+            return float('inf')
+        return self.occupied_degrees[position]
+
     def _update_median_on_insert(self, new_node):
         """updates the median element(s) after an insertion.
         """
@@ -183,15 +345,12 @@ class MedianTracker(object):
 
     def _receive_decrease(self, update):
         """receives a decrease in the degree.
-        To insert the node correctly we need to find the first degree below for which there is a node.
+        To insert the node correctly we need to find the first degree above degree_after for which there is a node,
+        it is found in occupied_degrees with a binary search.
         """
         degree_before, degree_after = update
-        _, _, node_above = self._receive_obsolete(degree_before)
-        for degree_above in xrange(degree_after + 1, degree_before + 1):
-            if self.degrees.get(degree_above):
-                break
-        else:
-            degree_above = node_above[0]
+        self._receive_obsolete(degree_before)
+        degree_above = self._next_occupied(degree_after)
         degree_below = self.nodes_linked_list[(degree_above, 0)]['below'][0]
         new_node = self._insert_node(degree_after, degree_below, degree_above)
         self._update_median_on_insert(new_node)
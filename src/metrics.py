@@ -0,0 +1,133 @@
+import math
+import time
+import json
+
+class LatencyHistogram(object):
+    """Histogram of durations in logarithmic buckets: bucket i holds the durations
+    between GROWTH ** (i - 1) and GROWTH ** i microseconds, so the percentiles have an error below 10%.
+    Adding a duration takes constant time and the memory is bounded by the number of buckets.
+    """
+
+    GROWTH = 1.1
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._log_growth = math.log(self.GROWTH)
+
+    def add(self, seconds):
+        """adds a duration in seconds"""
+        microseconds = seconds * 1e6
+        if microseconds > 1:
+            bucket = int(math.ceil(math.log(microseconds) / self._log_growth))
+        else:
+            bucket = 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """returns the upper bound in seconds of the bucket of the p percentile (0 < p <= 100), 0 if empty"""
+        if not self.count:
+            return 0.0
+        rank = p * self.count / 100.0
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.GROWTH ** bucket / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        """returns a dictionary with the count, the total, the mean, p50, p99 and max in seconds"""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+class Metrics(object):
+    """Latency of the stages of rolling_median.main and size of its data structures.
+    The stages are timed by wrapping the functions that implement them (see timed and timed_blocks),
+    so when the metrics are off there is nothing to do. The durations of each stage are kept
+    in a LatencyHistogram: the total is the cumulative time of the stage.
+
+    A report is a json line written to output_stream at most every interval seconds (see maybe_report)
+    with the latency of each stage and the sizes of the structures of each window.
+    """
+
+    def __init__(self, output_stream, interval):
+        self.output_stream = output_stream
+        self.interval = interval
+        self.stages = {}
+        self.lines = 0
+        self.start = time.time()
+        self.last_report = self.start
+
+    def _histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        return histogram
+
+    def timed(self, stage, function):
+        """returns function recording the duration of each call in the histogram of stage"""
+        add = self._histogram(stage).add
+        clock = time.time
+        def timed_function(*args):
+            start = clock()
+            result = function(*args)
+            add(clock() - start)
+            return result
+        return timed_function
+
+    def timed_blocks(self, stage, blocks):
+        """yields the items of blocks recording the time spent producing each of them"""
+        add = self._histogram(stage).add
+        clock = time.time
+        blocks = iter(blocks)
+        while True:
+            start = clock()
+            try:
+                block = next(blocks)
+            except StopIteration:
+                return
+            add(clock() - start)
+            yield block
+
+    def maybe_report(self, stacks):
+        """writes a report if interval seconds have passed since the previous one"""
+        if time.time() - self.last_report >= self.interval:
+            self.report(stacks)
+
+    def report(self, stacks):
+        """writes a report of the (OpsStorage, VenmoGraph, tracker) stacks of rolling_median.main"""
+        now = time.time()
+        self.last_report = now
+        report = {
+            'lines': self.lines,
+            'elapsed': now - self.start,
+            'stages': dict((stage, histogram.summary()) for stage, histogram in self.stages.iteritems()),
+            'sizes': dict((str(ops.window), structure_sizes(ops, graph, tracker)) for ops, graph, tracker in stacks)
+        }
+        self.output_stream.write(json.dumps(report, sort_keys=True) + '\n')
+        self.output_stream.flush()
+
+def structure_sizes(ops, graph, tracker):
+    """returns the sizes of the data structures of a window"""
+    return {
+        'transactions': graph.transaction_count,
+        'late_transactions': ops.late_count,
+        'nodes': len(graph.graph),
+        'edges': sum(graph.degree(node) for node in graph.graph) / 2,
+        'distinct_degrees': len([d for d in tracker.degrees if 0 < d < float('inf')]),
+        # only for MedianTracker
+        'linked_list_nodes': len(getattr(tracker, 'nodes_linked_list', ()))
+    }
@@ -1,17 +1,77 @@
+import collections
 import datetime
+import heapq
+import re
 import sys
 
+# canonical layout of created_time: "%Y-%m-%dT%H:%M:%SZ"
+_TIMESTAMP_RE = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)Z\Z')
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
 class OpsStorageException(Exception):
     pass
 
+def seconds_since_epoch(created_time):
+    """converts timestamps to seconds since the epoch.
+    Timestamps in the canonical layout are converted arithmetically,
+    anything else (eg single digit fields) goes through strptime.
+    Raises OpsStorageException if the timestamp is not valid.
+    """
+    match = _TIMESTAMP_RE.match(created_time) if isinstance(created_time, basestring) else None
+    if match:
+        year, month, day, hour, minute, second = map(int, match.groups())
+        if hour < 24 and minute < 60 and second < 60:
+            try:
+                days = datetime.date(year, month, day).toordinal() - _EPOCH_ORDINAL
+            except ValueError:
+                pass
+            else:
+                return days * 86400 + hour * 3600 + minute * 60 + second
+    return _strict_seconds_since_epoch(created_time)
+
+def _strict_seconds_since_epoch(created_time):
+    """converts timestamps to seconds since the epoch using strptime."""
+    try:
+        parsed_time = datetime.datetime.strptime(created_time, '%Y-%m-%dT%H:%M:%SZ')
+    except ValueError:
+        raise OpsStorageException('created time is not valid: {}'.format(created_time))
+    return int((parsed_time - datetime.datetime(1970, 1, 1)).total_seconds())
+
 class OpsStorage(object):
     """Class responsible of keeping transactions to be stored in a graph.
     When a new transaction arrives, the storage is updated and the list of edges to be added/deleted is returned
+
+    The transactions in the window are stored in a ring of one bucket for each second:
+    the messages with timestamp t are in the bucket t % window.
+    The timestamps of the non empty buckets are kept in a heap so that only those buckets are visited
+    when the window moves forward.
+    Transactions older than the window (late transactions) are counted in "late_count" and dropped,
+    unless late_buffer_size is given: in that case the last late_buffer_size late transactions
+    are kept for auditing in "late_messages" as (timestamp, message) tuples.
+    "late_dropped" counts the late transactions that are not kept.
+
+    If an interner (see interner.NameInterner) is given, the stored and returned messages are
+    {"actor": <actor id>, "target": <target id>} dictionaries where the names are replaced by their ids.
+    An id is released when the last transaction of its user is obsolete.
     """
 
-    def __init__(self):
-        self.transactions = {}
+    # default length in seconds of the sliding window
+    window = 60
+    # transactions in a burst share the same created_time,
+    # the cache is cleared when it reaches this size.
+    timestamp_cache_size = 1024
+
+    def __init__(self, interner=None, late_buffer_size=0, window=None):
+        if window is not None:
+            self.window = window
+        self.buckets = [[] for _ in xrange(self.window)]
+        self.occupied = []
         self.max_timestamp = 0
+        self.interner = interner
+        self.late_messages = collections.deque(maxlen=late_buffer_size)
+        self.late_count = 0
+        self.late_dropped = 0
+        self._timestamp_cache = {}
 
     def get_update(self, message):
         """From a json message updates the list of transactions
@@ -32,37 +92,114 @@ class OpsStorage(object):
                 [{"created_time": "2014-03-27T04:26:00Z", "target": "Maryann-Berry", "actor": "Jamie-Korn"}, ...]
             ]
         """
+        timestamp = self.validate(message)
+        return self.add(message, timestamp)
+
+    def validate(self, message):
+        """checks that a json message is a valid transaction and returns its timestamp.
+        Raises OpsStorageException if the message is not valid.
+        """
         timestamp = self._seconds_since_epoch(message.get('created_time', ''))
         if not message.get('actor'):
             raise OpsStorageException('Actor in message is missing.')
         if not message.get('target'):
             raise OpsStorageException('Target in message is missing.')
+        return timestamp
+
+    def add(self, message, timestamp):
+        """Same as get_update for a message that has already been validated.
+        The message only needs the "actor" and "target" keys.
+        """
+        if timestamp <= self.max_timestamp - self.window:
+            # the transaction is already out of the window
+            self._handle_late(message, timestamp)
+            return [], []
+        # obsolete buckets are emptied before the new message takes their place in the ring
+        if timestamp - self.window >= self.max_timestamp:
+            # the whole window is obsolete, its ids are released before the new names are interned
+            # so that the interner can be emptied at once
+            obsolete_messages = self._get_obsolete(timestamp)
+            message = self._intern(message)
+        else:
+            message = self._intern(message)
+            obsolete_messages = self._get_obsolete(timestamp)
         new_messages = self._get_new(message, timestamp)
-        obsolete_messages = self._get_obsolete(timestamp)
         self.max_timestamp = max(timestamp, self.max_timestamp)
         return new_messages, obsolete_messages
 
+    def advance(self, timestamp):
+        """moves the window forward to timestamp without adding a transaction
+        and returns the list of obsolete messages.
+        """
+        if timestamp <= self.max_timestamp:
+            return []
+        obsolete_messages = self._get_obsolete(timestamp)
+        self.max_timestamp = timestamp
+        return obsolete_messages
+
     def _get_obsolete(self, timestamp):
-        """gets all the messages older than 60 seconds from the current transaction timestamp"""
+        """gets all the messages out of the window (60 seconds by default) from the current transaction timestamp"""
         obsolete_messages = []
-        start = self.max_timestamp - 59
-        end = min(timestamp - 59, self.max_timestamp + 1)
-        for t in xrange(start, end):
-            obsolete_messages += self.transactions.pop(t, [])
+        buckets = self.buckets
+        occupied = self.occupied
+        window = self.window
+        whole_window = timestamp - window >= self.max_timestamp
+        if whole_window:
+            for t in occupied:
+                bucket = buckets[t % window]
+                obsolete_messages += bucket
+                del bucket[:]
+            del occupied[:]
+        else:
+            limit = timestamp - window
+            while occupied and occupied[0] <= limit:
+                bucket = buckets[heapq.heappop(occupied) % window]
+                obsolete_messages += bucket
+                del bucket[:]
+        interner = self.interner
+        if interner is not None and obsolete_messages:
+            if whole_window and interner.references() == 2 * len(obsolete_messages):
+                # no other storage shares the interner
+                interner.clear()
+            else:
+                release = interner.release
+                for m in obsolete_messages:
+                    release(m['actor'])
+                    release(m['target'])
         return obsolete_messages
 
+    def _intern(self, message):
+        """replaces the names of a message by their ids, if there is an interner."""
+        if self.interner is None:
+            return message
+        intern = self.interner.intern
+        return {'actor': intern(message['actor']), 'target': intern(message['target'])}
+
+    def _handle_late(self, message, timestamp):
+        """counts a late transaction and keeps it in the audit buffer if there is one."""
+        self.late_count += 1
+        late_messages = self.late_messages
+        if len(late_messages) == late_messages.maxlen:
+            # the message is dropped or pushes the oldest one out of the buffer
+            self.late_dropped += 1
+        late_messages.append((timestamp, message))
+
     def _get_new(self, message, timestamp):
         """gets the new messages from a single transatcion."""
-        self.transactions[timestamp] = self.transactions.get(timestamp, [])
-        self.transactions[timestamp].append(message)
-        if timestamp < self.max_timestamp - 59:
-            return []
+        bucket = self.buckets[timestamp % self.window]
+        if not bucket:
+            heapq.heappush(self.occupied, timestamp)
+        bucket.append(message)
         return [message]
 
     def _seconds_since_epoch(self, created_time):
-        """converts timstamps to seconds since the epoch."""
+        """converts timstamps to seconds since the epoch, memoizing the valid ones."""
         try:
-            parsed_time = datetime.datetime.strptime(created_time, '%Y-%m-%dT%H:%M:%SZ')
-        except ValueError:
-            raise OpsStorageException('created time is not valid: {}'.format(created_time))
-        return int((parsed_time - datetime.datetime(1970, 1, 1)).total_seconds())
+            return self._timestamp_cache[created_time]
+        except (KeyError, TypeError):
+            pass
+        timestamp = seconds_since_epoch(created_time)
+        if len(self._timestamp_cache) >= self.timestamp_cache_size:
+            self._timestamp_cache.clear()
+        self._timestamp_cache[created_time] = timestamp
+        return timestamp
@@ -0,0 +1,109 @@
+"""Compact binary format for the transactions.
+The valid transactions of a json input are compiled in a file starting with MAGIC
+and followed by one record for each transaction made of three int32 (little endian):
+    <seconds since the epoch> <actor id> <target id>
+The names of the users are stored in a separate json file (the names dictionary),
+a list in which the position of each name is its id.
+
+usage:
+    python src/packedtrans.py <output file> < venmo_input/venmo-trans.txt
+creates <output file> and <output file>.names
+"""
+import sys
+import mmap
+import json
+import array
+
+from ingestion import iter_blocks, decode_lines
+from opsstorage import OpsStorage, OpsStorageException
+
+MAGIC = 'VENMOPK1'
+RECORD_SIZE = 12
+# number of records read at once
+BLOCK_RECORDS = 1 << 16
+
+class PackedTransactionsException(Exception):
+    pass
+
+def _int32_array(data=''):
+    records = array.array('i')
+    records.fromstring(data)
+    if sys.byteorder == 'big':
+        records.byteswap()
+    return records
+
+def compile_transactions(input_stream, output_file, names_file):
+    """compiles the json transactions of input_stream into output_file and names_file.
+    Invalid transactions are dropped.
+    Returns the number of transactions written.
+    """
+    ops = OpsStorage()
+    ids = {}
+    names = []
+    count = 0
+    output_file.write(MAGIC)
+    for lines in iter_blocks(input_stream):
+        records = _int32_array()
+        for message in decode_lines(lines):
+            if message is None:
+                continue
+            try:
+                timestamp = ops.validate(message)
+            except OpsStorageException:
+                continue
+            if not -2 ** 31 <= timestamp < 2 ** 31:
+                raise PackedTransactionsException(
+                    'created time does not fit in 32 bits: {}'.format(message['created_time'])
+                )
+            record = [timestamp]
+            for name in (message['actor'], message['target']):
+                node_id = ids.get(name)
+                if node_id is None:
+                    node_id = ids[name] = len(names)
+                    names.append(name)
+                record.append(node_id)
+            records.extend(record)
+        if sys.byteorder == 'big':
+            records.byteswap()
+        output_file.write(records.tostring())
+        count += len(records) / 3
+    json.dump(names, names_file)
+    return count
+
+class PackedTransactions(object):
+    """Read only view of a compiled transaction file backed by a memory map."""
+
+    def __init__(self, input_file):
+        self.data = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise PackedTransactionsException('not a compiled transaction file')
+        if (len(self.data) - len(MAGIC)) % RECORD_SIZE:
+            raise PackedTransactionsException('truncated compiled transaction file')
+
+    def __len__(self):
+        return (len(self.data) - len(MAGIC)) / RECORD_SIZE
+
+    def iter_blocks(self, block_records=BLOCK_RECORDS, offset=0):
+        """yields the file offset of each block of at most block_records records and
+        the list of its (timestamp, actor id, target id) tuples.
+        If offset is given the records before it are skipped.
+        """
+        block_size = block_records * RECORD_SIZE
+        for start in xrange(max(offset, len(MAGIC)), len(self.data), block_size):
+            records = iter(_int32_array(self.data[start:start + block_size]))
+            yield start, zip(records, records, records)
+
+    def close(self):
+        self.data.close()
+
+def load_names(names_file):
+    """loads the names dictionary, the list of user names indexed by id."""
+    return json.load(names_file)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    with open(sys.argv[1], 'wb') as output_file:
+        with open(sys.argv[1] + '.names', 'w') as names_file:
+            count = compile_transactions(sys.stdin, output_file, names_file)
+    sys.stderr.write('{} transactions written to {}\n'.format(count, sys.argv[1]))
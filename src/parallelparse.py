@@ -0,0 +1,73 @@
+"""Decoding and validation of the json input in a pool of worker processes.
+Decoding a line, parsing its timestamp and validating it don't depend on the previous lines,
+only the OpsStorage, VenmoGraph and tracker updates do. The blocks of input lines are sent
+to the workers, that return for each valid transaction the tuple
+    (<timestamp>, <actor>, <target>)
+and the main process applies them in the input order, so the output is the same of a single process.
+The users are interned by OpsStorage in the main process: their ids are reused when a user leaves the window,
+so a worker can't assign them.
+
+At most READ_AHEAD blocks for each worker are read before their transactions are applied.
+"""
+import collections
+import multiprocessing
+
+from ingestion import iter_terminated_blocks, decode_lines
+from opsstorage import OpsStorage, OpsStorageException
+
+# blocks sent to each worker before waiting for the first result
+READ_AHEAD = 2
+
+# validates the messages in a worker, it only keeps the timestamp cache
+_validator = OpsStorage()
+
+def parse_lines(lines, keep_lines=False):
+    """decodes and validates a list of json lines (without the newline).
+    Returns the length of the lines in the input and the list of (<line>, <timestamp>, <actor>, <target>)
+    of the valid transactions. The line is None unless keep_lines is True (it is only needed for debugging).
+    """
+    length = 0
+    transactions = []
+    validate = _validator.validate
+    for line, message in zip(lines, decode_lines(lines)):
+        length += len(line) + 1
+        if message is None:
+            continue
+        try:
+            timestamp = validate(message)
+        except OpsStorageException:
+            continue
+        transactions.append((line if keep_lines else None, timestamp, message['actor'], message['target']))
+    return length, transactions
+
+def _parse_task(args):
+    return parse_lines(*args)
+
+def iter_parallel_transactions(input_stream, processes, block_size, offset=0, keep_lines=False):
+    """yields, for each block of json lines of input_stream, the input offset at the end of the block
+    and the list of valid transactions as (line, timestamp, message) tuples, as rolling_median.iter_json_transactions.
+    The input is read from the current position of input_stream, offset is the position at which it starts.
+    The offset is None for the last line of the input when it has no newline.
+    """
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = collections.deque()
+        blocks = iter_terminated_blocks(input_stream, block_size)
+        while True:
+            for lines, terminated in blocks:
+                pending.append((terminated, pool.apply_async(_parse_task, ((lines, keep_lines),))))
+                if len(pending) >= processes * READ_AHEAD:
+                    break
+            if not pending:
+                break
+            terminated, result = pending.popleft()
+            length, transactions = result.get()
+            offset += length
+            yield offset if terminated else None, [
+                (line, timestamp, {'actor': actor, 'target': target})
+                for line, timestamp, actor, target in transactions
+            ]
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,107 @@
+"""Rolling medians of many independent streams (partitions) in one process.
+Each transaction has a partition key, the value of a json field (eg "region"), and the graph of each key
+has its own OpsStorage, VenmoGraph and tracker. The output line of a transaction is its key
+followed by the median of the graph of its key. The transactions without the key are skipped.
+
+Each partition has its own window, that ends at the maximum timestamp of its transactions:
+the window moves and a transaction is late only according to the transactions of the same key,
+so a feed lagging behind the others keeps its transactions.
+
+The maximum timestamp of all the transactions (the "clock") is used to drop the idle partitions.
+The partitions are kept in the order of their last transaction: when the clock has moved a window forward
+since the last transaction of the oldest one, its state is dropped even if its own window still has transactions,
+its users are released from the interner shared by all the partitions and its next transaction creates it again,
+with an empty window. So the memory depends on the partitions active in the last window of the clock,
+and the medians of a key are the ones of a separate run on its transactions only while the key has no such idle gap:
+after the gap they are the medians of a separate run started at its next transaction.
+
+usage:
+    python src/rolling_median.py --partition-key <field> < venmo_input/venmo-trans.txt > venmo_output/output.txt
+"""
+import collections
+
+from ingestion import BLOCK_SIZE, iter_blocks, iter_lines, decode_lines
+from interner import NameInterner
+from opsstorage import OpsStorage, OpsStorageException
+from mediantracker import MedianTracker
+from venmograph import VenmoGraph
+
+class Partitions(object):
+    """The (OpsStorage, VenmoGraph, tracker, <clock at the last transaction>) state of each partition key
+    in "states", ordered by the time of the last transaction of each key.
+    """
+
+    def __init__(self, window=OpsStorage.window, MedianTrackerClass=MedianTracker, VenmoGraphClass=VenmoGraph):
+        self.window = window
+        self.MedianTrackerClass = MedianTrackerClass
+        self.VenmoGraphClass = VenmoGraphClass
+        self.interner = NameInterner()
+        self.states = collections.OrderedDict()
+        # maximum timestamp of all the transactions
+        self.clock = 0
+        # number of idle partitions dropped
+        self.evicted = 0
+
+    def add(self, key, message, timestamp):
+        """processes a valid transaction of the key partition and returns the median of the partition"""
+        if timestamp > self.clock:
+            self.clock = timestamp
+        states = self.states
+        state = states.pop(key, None)
+        if state is None:
+            ops = OpsStorage(self.interner, window=self.window)
+            graph = self.VenmoGraphClass()
+            tracker = self.MedianTrackerClass()
+            if hasattr(tracker, 'clear'):
+                graph.reset_on_clear(tracker)
+        else:
+            ops, graph, tracker, _ = state
+        states[key] = (ops, graph, tracker, self.clock)
+        tracker.receive_batch(graph.update(*ops.add(message, timestamp), timestamp=timestamp))
+        self._evict()
+        return tracker.median()
+
+    def _evict(self):
+        """drops the partitions without transactions since the clock was a window behind"""
+        states = self.states
+        limit = self.clock - self.window
+        while states:
+            key = next(iter(states))
+            ops, _, _, last_clock = states[key]
+            if last_clock > limit:
+                break
+            # makes all the transactions of the partition obsolete, releasing its users
+            ops.advance(ops.max_timestamp + ops.window)
+            del states[key]
+            self.evicted += 1
+
+def _key_string(key):
+    if isinstance(key, unicode):
+        return key.encode('utf-8')
+    return str(key)
+
+def main(input_stream, output_stream, key_field, block_size=BLOCK_SIZE, window=OpsStorage.window,
+        MedianTrackerClass=MedianTracker, VenmoGraphClass=VenmoGraph):
+    """writes to output_stream, for each valid transaction of input_stream with the key_field field,
+    the key and the median of its partition. The input is read in blocks as in rolling_median.main.
+    Returns the Partitions.
+    """
+    partitions = Partitions(window, MedianTrackerClass, VenmoGraphClass)
+    validate = OpsStorage().validate
+    add = partitions.add
+    blocks = iter_blocks(input_stream, block_size) if block_size else iter_lines(input_stream)
+    for lines in blocks:
+        output = []
+        for message in decode_lines(lines):
+            if message is None:
+                continue
+            key = message.get(key_field)
+            if key is None or isinstance(key, (dict, list)):
+                continue
+            try:
+                timestamp = validate(message)
+            except OpsStorageException:
+                continue
+            output.append('{} {:.2f}\n'.format(_key_string(key), add(key, message, timestamp)))
+        output_stream.write(''.join(output))
+    return partitions
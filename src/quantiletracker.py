@@ -0,0 +1,106 @@
+import re
+
+from fenwicktracker import FenwickMedianTracker
+
+class QuantileTrackerException(Exception):
+    pass
+
+_QUANTILE_RE = re.compile(r'p(\d+(\.\d+)?)$')
+
+def check_statistic(name):
+    """checks the name of a statistic (see QuantileTracker.statistic), raises QuantileTrackerException if it is unknown"""
+    if name in ('min', 'max', 'mean', 'var'):
+        return
+    match = _QUANTILE_RE.match(name)
+    if match is None or float(match.group(1)) > 100:
+        raise QuantileTrackerException('unknown statistic {}, use pNN (0 <= NN <= 100), min, max, mean or var'.format(name))
+
+def parse_statistic(name):
+    """returns the function of a tracker computing the statistic name (see QuantileTracker.statistic),
+    so that the name is parsed once and not for each output line. Raises QuantileTrackerException if it is unknown.
+    """
+    check_statistic(name)
+    if name == 'mean':
+        return lambda tracker: tracker.mean()
+    if name == 'var':
+        return lambda tracker: tracker.variance()
+    if name == 'min':
+        q = 0
+    elif name == 'max':
+        q = 1
+    else:
+        q = float(name[1:]) / 100
+    return lambda tracker: tracker.quantile(q)
+
+class QuantileTracker(FenwickMedianTracker):
+    """Order statistics of the graph degrees.
+    It receives the same degree updates of MedianTracker and, besides the median, it returns any quantile
+    of the degrees from the Fenwick tree of FenwickMedianTracker in O(log(max degree)).
+    The sum of the degrees and of their squares are updated with each degree update,
+    so that the mean and the variance are computed in constant time.
+    """
+
+    def __init__(self):
+        super(QuantileTracker, self).__init__()
+        self.total = 0
+        self.total_squares = 0
+
+    @classmethod
+    def from_degrees(cls, degrees):
+        """creates a tracker from the number of nodes for each degree ({<degree>: <count>})."""
+        tracker = super(QuantileTracker, cls).from_degrees(degrees)
+        for degree, count in tracker.degrees.iteritems():
+            tracker.total += degree * count
+            tracker.total_squares += degree * degree * count
+        return tracker
+
+    def receive(self, update):
+        """Receives and processes one degree update (<old_degree>, <new_degree>)."""
+        super(QuantileTracker, self).receive(update)
+        degree_before, degree_after = update
+        self.total += degree_after - degree_before
+        self.total_squares += degree_after * degree_after - degree_before * degree_before
+
+    def receive_batch(self, updates):
+        """Receives and processes a list of degree updates, the ones of a single transaction."""
+        super(QuantileTracker, self).receive_batch(updates)
+        for degree_before, degree_after in updates:
+            self.total += degree_after - degree_before
+            self.total_squares += degree_after * degree_after - degree_before * degree_before
+
+    def quantile(self, q):
+        """returns the q quantile of the degrees (0 <= q <= 1), interpolating linearly between
+        the two closest ranks, so that quantile(0.5) is the median.
+        """
+        size = self.size
+        if size == 0:
+            # same as the median with no nodes
+            return float('inf')
+        # rounded so that eg (size - 1) * 0.9 is not just below an integer
+        position = round((size - 1) * q, 9)
+        rank = int(position)
+        low = self._kth(rank + 1)
+        if rank == position or rank + 1 == size:
+            return low
+        high = self._kth(rank + 2)
+        return low + (position - rank) * (high - low)
+
+    def mean(self):
+        """returns the mean degree, 0 if there are no nodes"""
+        if self.size == 0:
+            return 0.0
+        return float(self.total) / self.size
+
+    def variance(self):
+        """returns the (population) variance of the degrees, 0 if there are no nodes"""
+        size = self.size
+        if size == 0:
+            return 0.0
+        # exact integer arithmetic until the final division
+        return float(size * self.total_squares - self.total * self.total) / (size * size)
+
+    def statistic(self, name):
+        """returns a statistic by name: pNN is the NN percentile (eg p90, p99.9),
+        min, max, mean and var are the minimum, maximum, mean and variance of the degrees.
+        """
+        return parse_statistic(name)(self)
@@ -0,0 +1,178 @@
+"""Read only HTTP queries of the state of rolling_median while it reads the input.
+The server answers on localhost in a separate thread, each query is a GET returning json:
+    /degree?user=<user>           degree of a user
+    /neighbors?user=<user>        {<neighbor>: <transaction count>} of a user
+    /median                       current median
+    /histogram                    {<degree>: <number of users>}
+    /metrics                      latency of the queries (count, mean, p50, p99 and max in seconds)
+The window can be chosen with the window=<seconds> parameter, the default is the first one.
+In packed mode the users are given and returned as ids.
+
+rolling_median holds the state lock while it processes a block of input,
+a query waits for the end of the block and holds the lock only to read the state it needs.
+"""
+import json
+import time
+import threading
+import urlparse
+import BaseHTTPServer
+import SocketServer
+
+from metrics import LatencyHistogram
+
+class QueryServerException(Exception):
+    pass
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # the default prints to the standard output, that is the output of rolling_median
+        pass
+
+class QueryServer(object):
+    """Serves the queries about the (OpsStorage, VenmoGraph, tracker) stacks of rolling_median.main.
+    The interner converts between the users and the graph nodes, in packed mode the users are ids.
+    Use port 0 to choose any free port (see the port property).
+    """
+
+    def __init__(self, port, state_lock, stacks, interner, packed=False):
+        self.state_lock = state_lock
+        self.stacks = stacks
+        self.interner = interner
+        self.packed = packed
+        self.latencies = {}
+        self.metrics_lock = threading.Lock()
+        self.queries = {
+            '/degree': self._degree,
+            '/neighbors': self._neighbors,
+            '/median': self._median,
+            '/histogram': self._histogram,
+            '/metrics': self._metrics
+        }
+        self.server = _ThreadingHTTPServer(('127.0.0.1', port), _make_handler(self))
+        self.port = self.server.server_address[1]
+        self.thread = None
+
+    def start(self):
+        """starts serving in a daemon thread"""
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def answer(self, path, params):
+        """returns the json answer of a query and records its latency"""
+        start = time.time()
+        query = self.queries.get(path)
+        if query is None:
+            raise QueryServerException('unknown query {}'.format(path))
+        result = json.dumps(query(params))
+        elapsed = time.time() - start
+        with self.metrics_lock:
+            latency = self.latencies.get(path)
+            if latency is None:
+                latency = self.latencies[path] = LatencyHistogram()
+            latency.add(elapsed)
+        return result
+
+    def _stack(self, params):
+        if 'window' not in params:
+            return self.stacks[0]
+        for stack in self.stacks:
+            if str(stack[0].window) == params['window']:
+                return stack
+        raise QueryServerException('unknown window {}'.format(params['window']))
+
+    def _user(self, params):
+        if 'user' not in params:
+            raise QueryServerException('missing user parameter')
+        if self.packed:
+            try:
+                return int(params['user'])
+            except ValueError:
+                raise QueryServerException('the user must be an id in packed mode')
+        try:
+            return params['user'].decode('utf-8')
+        except UnicodeDecodeError:
+            raise QueryServerException('the user must be utf-8')
+
+    def user_id(self, user):
+        """returns the graph node of a user, None if the user is not in the window"""
+        return self.interner.ids.get(user)
+
+    def user_name(self, node):
+        return self.interner.name(node)
+
+    def _degree(self, params):
+        user = self._user(params)
+        _, graph, _ = self._stack(params)
+        with self.state_lock:
+            node = self.user_id(user)
+            degree = graph.degree(node) if node is not None else 0
+        return {'user': user, 'degree': degree}
+
+    def _neighbors(self, params):
+        user = self._user(params)
+        _, graph, _ = self._stack(params)
+        with self.state_lock:
+            node = self.user_id(user)
+            if node is None:
+                neighbors = {}
+            else:
+                user_name = self.user_name
+                neighbors = dict(
+                    (user_name(neighbor), count) for neighbor, count in graph.neighbors(node).iteritems()
+                )
+        return {'user': user, 'neighbors': neighbors}
+
+    def _median(self, params):
+        _, _, tracker = self._stack(params)
+        with self.state_lock:
+            median = tracker.median()
+        return {'median': median if median != float('inf') else None}
+
+    def _histogram(self, params):
+        _, _, tracker = self._stack(params)
+        with self.state_lock:
+            # MedianTracker counts two fake nodes with degree 0 and infinite
+            histogram = dict(
+                (str(degree), count) for degree, count in tracker.degrees.iteritems()
+                if 0 < degree < float('inf')
+            )
+        return {'histogram': histogram}
+
+    def _metrics(self, params):
+        with self.metrics_lock:
+            return dict((path, latency.summary()) for path, latency in self.latencies.iteritems())
+
+def _make_handler(query_server):
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse.urlparse(self.path)
+            params = dict(urlparse.parse_qsl(url.query))
+            try:
+                body = query_server.answer(url.path, params)
+                status = 200
+            except QueryServerException as e:
+                body = json.dumps({'error': str(e)})
+                status = 404 if url.path not in query_server.queries else 400
+            except ValueError as e:
+                # any other invalid parameter
+                body = json.dumps({'error': 'invalid query: {}'.format(e)})
+                status = 400
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # the standard error is used by rolling_median
+            pass
+    return Handler
@@ -1,42 +1,437 @@
 import sys
-import json
+import argparse
+import threading
 
+import checkpoint
+from ingestion import BLOCK_SIZE, iter_terminated_blocks, iter_lines, decode_lines
+from interner import NameInterner
+from metrics import Metrics
+from fenwicktracker import FenwickMedianTracker
 from mediantracker import MedianTracker
 from opsstorage import OpsStorage, OpsStorageException
+from topdegrees import TopDegreeTracker
+from components import ComponentTracker
+from queryserver import QueryServer
+from parallelparse import iter_parallel_transactions
+from segments import run_segments, SegmentException
+import partitions
+from runlength import RunLengthEncoder
+from quantiletracker import QuantileTracker, QuantileTrackerException, check_statistic, parse_statistic
+from packedtrans import PackedTransactions, RECORD_SIZE
 from venmograph import VenmoGraph
+from compactgraph import CompactVenmoGraph
 
-def main(input_stream, output_stream, debug=False, MedianTrackerClass=MedianTracker):
+# number of output lines between two checkpoints
+CHECKPOINT_INTERVAL = 1000000
+
+# seconds between two metrics reports
+METRICS_INTERVAL = 10
+
+TRACKER_CLASSES = {
+    'linkedlist': MedianTracker,
+    'fenwick': FenwickMedianTracker,
+    'quantile': QuantileTracker
+}
+
+GRAPH_CLASSES = {
+    'dict': VenmoGraph,
+    'compact': CompactVenmoGraph
+}
+
+def main(input_stream, output_stream, debug=False, MedianTrackerClass=MedianTracker,
+        block_size=BLOCK_SIZE, packed=False, windows=(OpsStorage.window,),
+        checkpoint_path=None, checkpoint_interval=CHECKPOINT_INTERVAL, VenmoGraphClass=VenmoGraph,
+        statistics=(), top=0, components=False, query_port=None,
+        metrics_stream=None, metrics_interval=METRICS_INTERVAL, runs=False, processes=0):
     """This methods executes the following steps:
     1) for each line from the input_stream, uses the OpsStorage instance to process the transaction
     2) gets from it a batch of new and obsolete messages
     3) uses the VenmoGraph Instance to process this batch
     4) the results is a list of degree updates
-    5) they are all processed by the MedianTracker that returns the rolling median
-    6) the median is written to the output_stream"""
-    ops = OpsStorage()
-    graph = VenmoGraph()
-    tracker = MedianTrackerClass()
-    for line in input_stream:
-        try:
-            message = json.loads(line)
-        except ValueError:
-            # skip message
-            continue
+    5) they are processed at once by the MedianTracker (receive_batch) that returns the rolling median
+    6) the median is written to the output_stream
+
+    The input is read in blocks of block_size bytes that are decoded at once
+    and the medians of a block are written with a single write.
+    If block_size is 0 each line is processed as soon as it is read.
+    If packed is True, input_stream is a file compiled by packedtrans.py that is memory mapped.
+
+    windows is the list of window lengths in seconds: each transaction is parsed once
+    and processed by an OpsStorage, VenmoGraph and MedianTracker for each window.
+    The medians of the windows are written on the same line separated by a space.
+
+    If checkpoint_path is given, the state is saved there at the end of the block in which
+    checkpoint_interval lines have been written since the previous checkpoint and at the end of the input.
+    A last line without newline is not covered by the checkpoints: it is read again on resume.
+    If a checkpoint already exists the state is restored from it, the input is read from the
+    offset covered by the checkpoint and the output is truncated to the checkpoint output offset
+    (the output should be opened in append mode).
+
+    VenmoGraphClass can be replaced by compactgraph.CompactVenmoGraph to use less memory.
+
+    statistics is a list of names of other statistics of the degrees (see QuantileTracker.statistic),
+    written after the median of each window. The MedianTrackerClass must have the statistic method.
+
+    If top is greater than 0, the top users with the highest degrees of each window are written in a column
+    after the statistics as <user>:<degree>,<user>:<degree>,... (user ids in packed mode).
+    The order of the users with the same degree depends on the previous updates and is not saved
+    in checkpoints, so top can't be used with checkpoint_path.
+
+    If components is True, the number of connected components and the size of the largest one
+    are written in two columns at the end of each window.
+
+    If query_port is given, a QueryServer answers queries about the state on that localhost port
+    while the input is processed. The state is locked while a block is processed.
+
+    If metrics_stream is given, the latency of each stage (decode of a block, OpsStorage, VenmoGraph
+    and tracker updates of a line, write of a block) and the sizes of the data structures are written to it
+    as a json line every metrics_interval seconds and at the end (see metrics.Metrics).
+
+    If runs is True, consecutive equal output lines are written as a single <line> <repeat count> record
+    (see runlength.py). A run is written when the output changes, at a checkpoint and at the end of the input.
+
+    If processes is greater than 0, the json blocks are decoded and validated by that many worker processes
+    (see parallelparse.py) while the main process updates the state. block_size must be greater than 0.
+    """
+    if statistics and not hasattr(MedianTrackerClass, 'statistic'):
+        raise QuantileTrackerException('{} does not compute statistics other than the median'.format(
+            MedianTrackerClass.__name__
+        ))
+    statistic_functions = [parse_statistic(name) for name in statistics]
+    if top and checkpoint_path:
+        raise checkpoint.CheckpointException('the top users are not saved in checkpoints')
+    state = checkpoint.load(checkpoint_path) if checkpoint_path else None
+    if state is None:
+        interner = NameInterner()
+        stacks = [
+            (OpsStorage(interner, window=window), VenmoGraphClass(), MedianTrackerClass())
+            for window in windows
+        ]
+        input_offset = output_offset = 0
+    else:
+        interner, stacks = checkpoint.restore(state, MedianTrackerClass)
+        if [ops.window for ops, _, _ in stacks] != list(windows):
+            raise checkpoint.CheckpointException('the checkpoint windows are not {}'.format(windows))
+        input_offset = state['input_offset']
+        output_offset = state['output_offset']
+        _resume_output(output_stream, output_offset)
+    for _, graph, tracker in stacks:
+        if hasattr(tracker, 'clear'):
+            # a jump forward in time resets the tracker
+            graph.reset_on_clear(tracker)
+    top_trackers = []
+    # last top users and their column for each window, the column is formatted again only when they change
+    top_columns = []
+    if top:
+        for _, graph, _ in stacks:
+            top_trackers.append(TopDegreeTracker(top))
+            graph.add_observer(top_trackers[-1])
+            top_columns.append((None, ''))
+    component_trackers = []
+    if components:
+        for ops, graph, _ in stacks:
+            component_trackers.append(ComponentTracker())
+            # after a checkpoint the edges are rebuilt from the transactions in the window
+            for timestamp in sorted(ops.occupied):
+                for m in ops.buckets[timestamp % ops.window]:
+                    component_trackers[-1].add_edge(m['target'], m['actor'], timestamp)
+            graph.add_observer(component_trackers[-1])
+    user_name = interner.name
+    state_lock = threading.Lock()
+    server = None
+    if query_port is not None:
+        server = QueryServer(query_port, state_lock, stacks, interner, packed)
+        server.start()
+    if packed:
+        blocks = iter_packed_transactions(input_stream, input_offset)
+    elif processes:
+        _seek(input_stream, input_offset)
+        blocks = iter_parallel_transactions(input_stream, processes, block_size, input_offset, keep_lines=debug)
+    else:
+        blocks = iter_json_transactions(input_stream, stacks[0][0], block_size, input_offset)
+    # the functions of each stage, replaced by timed ones in metrics mode
+    stage_functions = [(ops.add, graph.update, tracker.receive_batch) for ops, graph, tracker in stacks]
+    write = output_stream.write
+    metrics = None
+    if metrics_stream is not None:
+        metrics = Metrics(metrics_stream, metrics_interval)
+        blocks = metrics.timed_blocks('decode', blocks)
+        write = metrics.timed('write', write)
+        for i, (ops, _, _) in enumerate(stacks):
+            suffix = '.{}'.format(ops.window) if len(stacks) > 1 else ''
+            stage_functions[i] = tuple(
+                metrics.timed(stage + suffix, function)
+                for stage, function in zip(('ops', 'graph', 'tracker'), stage_functions[i])
+            )
+    # the medians are integers or halves of integers, their formatted strings are memoized
+    median_strings = {}
+    # only the median of one window on each line
+    single_column = len(stacks) == 1 and not (debug or statistics or top or components)
+    encoder = RunLengthEncoder() if runs else None
+    try:
+        lines_since_checkpoint = 0
+        # the checkpoint of the end of the input was saved before its unterminated last line
+        saved_at_end = False
+        for block_offset, transactions in blocks:
+            if block_offset is None:
+                if checkpoint_path:
+                    output_offset += _flush_runs(encoder, write)
+                    _save_checkpoint(checkpoint_path, output_stream, interner, stacks, input_offset, output_offset)
+                    saved_at_end = True
+            else:
+                input_offset = block_offset
+            output = []
+            with state_lock:
+                if single_column:
+                    add, update, receive_batch = stage_functions[0]
+                    tracker = stacks[0][2]
+                    for line, timestamp, message in transactions:
+                        new_messages, obsolete_messages = add(message, timestamp)
+                        receive_batch(update(new_messages, obsolete_messages, timestamp))
+                        median = tracker.median()
+                        median_line = median_strings.get(median)
+                        if median_line is None:
+                            median_line = median_strings[median] = '{:.2f}\n'.format(median)
+                        output.append(median_line)
+                else:
+                    for line, timestamp, message in transactions:
+                        medians = []
+                        for i, (ops, graph, tracker) in enumerate(stacks):
+                            add, update, receive_batch = stage_functions[i]
+                            new_messages, obsolete_messages = add(message, timestamp)
+                            receive_batch(update(new_messages, obsolete_messages, timestamp))
+                            median = tracker.median()
+                            median_string = median_strings.get(median)
+                            if median_string is None:
+                                median_string = median_strings[median] = '{:.2f}'.format(median)
+                            medians.append(median_string)
+                            for statistic in statistic_functions:
+                                medians.append('{:.2f}'.format(statistic(tracker)))
+                            if top_trackers:
+                                top_users = top_trackers[i].top()
+                                if top_users != top_columns[i][0]:
+                                    top_columns[i] = (top_users, ','.join(
+                                        '{}:{}'.format(user_name(node), degree) for node, degree in top_users
+                                    ))
+                                medians.append(top_columns[i][1])
+                            if component_trackers:
+                                medians.append('{} {}'.format(component_trackers[i].count, component_trackers[i].largest()))
+                        if debug:
+                            output.append('{} {} {}\n'.format(
+                                line.strip(), ' '.join(str(tracker.degrees) for _, _, tracker in stacks),
+                                ' '.join(medians)
+                            ))
+                        else:
+                            output.append(' '.join(medians) + '\n')
+            # one string for each output line
+            if encoder is not None:
+                output = encoder.encode(output)
+            else:
+                output = ''.join(output)
+            write(output)
+            if metrics is not None:
+                metrics.lines += len(transactions)
+                metrics.maybe_report(stacks)
+            if checkpoint_path:
+                output_offset += len(output)
+                lines_since_checkpoint += len(transactions)
+                if lines_since_checkpoint >= checkpoint_interval:
+                    output_offset += _flush_runs(encoder, write)
+                    _save_checkpoint(checkpoint_path, output_stream, interner, stacks, input_offset, output_offset)
+                    lines_since_checkpoint = 0
+        output_offset += _flush_runs(encoder, write)
+        if checkpoint_path and not saved_at_end:
+            _save_checkpoint(checkpoint_path, output_stream, interner, stacks, input_offset, output_offset)
+        if metrics is not None:
+            metrics.report(stacks)
+    finally:
+        if server is not None:
+            server.stop()
+
+def _flush_runs(encoder, write):
+    """writes the current run of the encoder, if any, and returns the length written"""
+    if encoder is None:
+        return 0
+    run = encoder.flush()
+    if run:
+        write(run)
+    return len(run)
+
+def _save_checkpoint(path, output_stream, interner, stacks, input_offset, output_offset):
+    # the output covered by the checkpoint must be written before the checkpoint
+    output_stream.flush()
+    checkpoint.save(path, checkpoint.snapshot(interner, stacks, input_offset, output_offset))
+
+def _resume_output(output_stream, offset):
+    """drops the output written after the checkpoint, if the output can be truncated."""
+    try:
+        output_stream.seek(0, 2)
+        if output_stream.tell() >= offset:
+            output_stream.seek(offset)
+            output_stream.truncate()
+    except (IOError, AttributeError):
+        # not a regular file, eg a pipe
+        pass
+
+def _seek(input_stream, offset):
+    """moves the input to offset, reading and discarding it if the input is not a regular file."""
+    try:
+        input_stream.seek(offset)
+    except (IOError, AttributeError):
+        while offset > 0:
+            data = input_stream.read(min(offset, BLOCK_SIZE))
+            if not data:
+                break
+            offset -= len(data)
+
+def iter_json_transactions(input_stream, ops, block_size=BLOCK_SIZE, offset=0):
+    """yields, for each block of json lines, the input offset at the end of the block
+    and the list of valid transactions as (line, timestamp, message) tuples.
+    The offset is None for the last line of the input when it has no newline."""
+    if offset:
+        _seek(input_stream, offset)
+    if block_size:
+        blocks = iter_terminated_blocks(input_stream, block_size)
+        # the newline is not in the line
+        newline = 1
+    else:
+        blocks = ((lines, lines[0].endswith('\n')) for lines in iter_lines(input_stream))
+        newline = 0
+    for lines, terminated in blocks:
+        transactions = []
+        for line, message in zip(lines, decode_lines(lines)):
+            offset += len(line) + newline
+            if message is None:
+                # skip message
+                continue
+            try:
+                timestamp = ops.validate(message)
+            except OpsStorageException:
+                # skip message
+                continue
+            transactions.append((line, timestamp, message))
+        yield offset if terminated else None, transactions
+
+def iter_packed_transactions(input_file, offset=0):
+    """yields, for each block of records of a compiled transaction file, the offset at the end of the block
+    and the list of transactions as (line, timestamp, message) tuples. The line is only used for debugging."""
+    packed = PackedTransactions(input_file)
+    for start, records in packed.iter_blocks(offset=offset):
+        yield start + len(records) * RECORD_SIZE, [
+            ('{} {} {}'.format(*r), r[0], {'actor': r[1], 'target': r[2]})
+            for r in records
+        ]
+    packed.close()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Rolling median of the Venmo graph degrees.')
+    parser.add_argument('debug', nargs='?', choices=['debug'],
+        help='write each transaction and the degree counts before the median')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+        help='size in bytes of the input blocks, 0 to process each line as soon as it is read')
+    parser.add_argument('--packed', action='store_true',
+        help='the input is a file compiled by packedtrans.py')
+    parser.add_argument('--window', type=int, action='append', dest='windows',
+        help='length in seconds of the sliding window (default 60), '
+        'repeat the option to compute the medians of several windows in one pass')
+    parser.add_argument('--checkpoint', dest='checkpoint_path',
+        help='file in which the state is periodically saved and from which it is restored at startup')
+    parser.add_argument('--checkpoint-interval', type=int, default=CHECKPOINT_INTERVAL,
+        help='number of output lines between two checkpoints')
+    parser.add_argument('--graph', choices=sorted(GRAPH_CLASSES), default='dict',
+        help='graph store, "compact" uses less memory for nodes with few neighbors')
+    parser.add_argument('--tracker', choices=sorted(TRACKER_CLASSES),
+        help='median engine (default linkedlist), "fenwick" keeps only a count for each degree, '
+        '"quantile" also computes the statistics of --stat (the default when --stat is used)')
+    parser.add_argument('--stat', action='append', dest='statistics', default=[],
+        help='statistic of the degrees written after the median: pNN (eg p90, p99.9), min, max, mean or var, '
+        'repeat the option for more columns')
+    parser.add_argument('--top', type=int, default=0,
+        help='number of users with the highest degrees written in a column after the median of each window')
+    parser.add_argument('--query-port', type=int,
+        help='localhost port of the http server answering queries about the state (see src/queryserver.py)')
+    parser.add_argument('--metrics', dest='metrics_path',
+        help='file (- for the standard error) to which the latency of each stage and the sizes of the data structures '
+        'are written periodically as json lines')
+    parser.add_argument('--metrics-interval', type=float, default=METRICS_INTERVAL,
+        help='seconds between two metrics reports')
+    parser.add_argument('--components', action='store_true',
+        help='write the number of connected components and the size of the largest one after the median of each window')
+    parser.add_argument('--processes', type=int, default=0,
+        help='number of worker processes decoding the json input, 0 to decode it in the main process')
+    parser.add_argument('--segments', type=int, default=0,
+        help='number of worker processes running the independent time segments of the input, a regular file '
+        '(see src/segments.py)')
+    parser.add_argument('--partition-key', dest='partition_key',
+        help='json field of the partition of each transaction: the median of each partition is computed '
+        'in its own graph and written after the key (see src/partitions.py)')
+    parser.add_argument('--runs', action='store_true',
+        help='write consecutive equal output lines as a single "<line> <repeat count>" record '
+        '(expanded by src/runlength.py)')
+    args = parser.parse_args(argv)
+    for name in args.statistics:
         try:
-            new_messages, obsolete_messages = ops.get_update(message)
-        except OpsStorageException:
-            # skip message
-            continue
-        degree_updates = graph.update(new_messages, obsolete_messages)
-        for update in degree_updates:
-            tracker.receive(update)
-        if debug:
-            output_stream.write('{} {} '.format(line.strip(), tracker.degrees))
-        output_stream.write('{:.2f}\n'.format(tracker.median()))
+            check_statistic(name)
+        except QuantileTrackerException as e:
+            parser.error(str(e))
+    if args.tracker is None:
+        args.tracker = 'quantile' if args.statistics else 'linkedlist'
+    elif args.statistics and args.tracker != 'quantile':
+        parser.error('--stat requires the quantile tracker')
+    if args.top < 0:
+        parser.error('the number of top users must be positive')
+    if args.top and args.checkpoint_path:
+        parser.error('--top can\'t be used with --checkpoint, the order of the top users is not saved')
+    if args.processes < 0:
+        parser.error('the number of processes must be positive')
+    if args.processes and (args.packed or not args.block_size):
+        parser.error('--processes requires json input read in blocks')
+    if args.segments < 0:
+        parser.error('the number of processes must be positive')
+    if args.segments and (args.packed or not args.block_size or args.debug or args.top or args.processes
+            or args.checkpoint_path or args.query_port is not None or args.metrics_path):
+        parser.error('--segments can only be used with json input read in blocks, --window, --graph, --tracker, '
+            '--stat, --components and --runs')
+    if args.partition_key and (args.packed or args.debug or args.statistics or args.top or args.components
+            or args.processes or args.segments or args.checkpoint_path or args.query_port is not None
+            or args.metrics_path or args.runs or (args.windows and len(args.windows) > 1)):
+        parser.error('--partition-key can only be used with json input, one --window, --block-size, --graph and --tracker')
+    if args.windows is None:
+        args.windows = [OpsStorage.window]
+    if min(args.windows) < 1:
+        parser.error('the window length must be at least 1 second')
+    return args
 
 if __name__ == '__main__':
-    if len(sys.argv) == 2:
-        debug = (sys.argv[1] == 'debug')
+    args = parse_args(sys.argv[1:])
+    if args.metrics_path == '-':
+        metrics_stream = sys.stderr
+    elif args.metrics_path:
+        metrics_stream = open(args.metrics_path, 'a')
     else:
-        debug = False
-    main(sys.stdin, sys.stdout, debug)
+        metrics_stream = None
+    if args.partition_key:
+        partitions.main(
+            sys.stdin, sys.stdout, args.partition_key, block_size=args.block_size, window=args.windows[0],
+            VenmoGraphClass=GRAPH_CLASSES[args.graph], MedianTrackerClass=TRACKER_CLASSES[args.tracker]
+        )
+        sys.exit()
+    if args.segments:
+        try:
+            run_segments(
+                sys.stdin, sys.stdout, args.segments, main, block_size=args.block_size, windows=args.windows,
+                VenmoGraphClass=GRAPH_CLASSES[args.graph], MedianTrackerClass=TRACKER_CLASSES[args.tracker],
+                statistics=args.statistics, components=args.components, runs=args.runs
+            )
+        except SegmentException as e:
+            sys.exit(str(e))
+        sys.exit()
+    main(
+        sys.stdin, sys.stdout, args.debug == 'debug',
+        block_size=args.block_size, packed=args.packed, windows=args.windows,
+        checkpoint_path=args.checkpoint_path, checkpoint_interval=args.checkpoint_interval,
+        VenmoGraphClass=GRAPH_CLASSES[args.graph], MedianTrackerClass=TRACKER_CLASSES[args.tracker],
+        statistics=args.statistics, top=args.top, components=args.components,
+        query_port=args.query_port, metrics_stream=metrics_stream, metrics_interval=args.metrics_interval,
+        runs=args.runs, processes=args.processes
+    )
@@ -0,0 +1,97 @@
+"""Run length encoding of the output of rolling_median.
+Consecutive equal output lines are written as a single record:
+    <output line> <repeat count>
+eg the lines 1.00 1.00 1.50 1.50 1.50 are written as the records "1.00 2" and "1.50 3".
+The median changes only when the degrees around it change, so on a busy stream
+the output shrinks by the average length of the runs.
+A run is written when a different line arrives, so the last run is delayed until the median changes
+(or until a checkpoint or the end of the input, that end the current run).
+
+usage:
+    python src/runlength.py < venmo_output/output.txt.runs > venmo_output/output.txt
+expands the records to the output with one line for each transaction.
+"""
+import sys
+
+class RunLengthException(Exception):
+    pass
+
+class RunLengthEncoder(object):
+    """Encodes the output lines in runs, the current run is kept until a different line arrives."""
+
+    def __init__(self):
+        # current line (with the newline) and number of repetitions
+        self.line = None
+        self.count = 0
+
+    def encode(self, lines):
+        """receives a list of output lines ending with a newline and returns the text of the runs they complete."""
+        runs = []
+        current = self.line
+        count = self.count
+        for line in lines:
+            # the median strings are memoized, so equal lines are usually the same object
+            if line == current:
+                count += 1
+            else:
+                if count:
+                    runs.append('{} {}\n'.format(current[:-1], count))
+                current = line
+                count = 1
+        self.line = current
+        self.count = count
+        return ''.join(runs)
+
+    def flush(self):
+        """returns the text of the current run and starts a new one."""
+        if not self.count:
+            return ''
+        run = '{} {}\n'.format(self.line[:-1], self.count)
+        self.line = None
+        self.count = 0
+        return run
+
+def _split_run(record):
+    line, _, count = record.rpartition(' ')
+    return line, int(count)
+
+def merge_runs(texts):
+    """yields the runs of consecutive texts of runs (eg the outputs of consecutive parts of the input),
+    merging the last run of a text with the first one of the next when they have the same line.
+    """
+    # the last run seen, written when the next text doesn't continue it
+    line = None
+    count = 0
+    for text in texts:
+        if not text:
+            continue
+        first_end = text.index('\n') + 1
+        first_line, first_count = _split_run(text[:first_end - 1])
+        if count and first_line == line:
+            count += first_count
+            text = text[first_end:]
+            if not text:
+                continue
+        last_start = text.rfind('\n', 0, len(text) - 1) + 1
+        head = '{} {}\n'.format(line, count) if count else ''
+        yield head + text[:last_start]
+        line, count = _split_run(text[last_start:-1])
+    if count:
+        yield '{} {}\n'.format(line, count)
+
+def decode(input_stream, output_stream):
+    """writes to output_stream the lines of the runs read from input_stream, returns the number of lines."""
+    total = 0
+    for record in input_stream:
+        line, _, count = record.rstrip('\n').rpartition(' ')
+        if not line or not count.isdigit() or not int(count):
+            raise RunLengthException('invalid run {!r}'.format(record))
+        count = int(count)
+        output_stream.write((line + '\n') * count)
+        total += count
+    return total
+
+if __name__ == '__main__':
+    if len(sys.argv) != 1:
+        sys.exit(__doc__)
+    decode(sys.stdin, sys.stdout)
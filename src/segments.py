@@ -0,0 +1,156 @@
+"""Parallel processing of the independent time segments of an input file.
+A transaction more than a window past the maximum timestamp of the previous ones makes every transaction
+in the window obsolete: the graph is cleared and the later lines don't depend on the earlier ones
+(a later line older than the previous maximum is older than the transaction that cleared the window,
+so it is late and dropped in any case). The file can be cut before each of these transactions
+and the segments processed by rolling_median.main in worker processes: the concatenation of their
+outputs is the output of a single run. With runs (see runlength.py) the run at the end of a segment
+is merged with the run at the start of the next one when they have the same line.
+
+The cut points are found by a first pass in the same workers, each decoding and validating a block of the file.
+The segments are then formed from the cut points closest to SEGMENTS_PER_PROCESS equal parts for each process.
+The file is memory mapped before the workers are started, so they share it without it being sent to them
+and each worker reads its segments from the mapping a block at a time.
+
+The order of users with the same degree and the degree dictionaries depend on the previous lines,
+so the segments can't be used for the top users or the debug output.
+"""
+import os
+import stat
+import bisect
+import mmap
+import multiprocessing
+from StringIO import StringIO
+
+from ingestion import BLOCK_SIZE, decode_lines
+from opsstorage import OpsStorage, OpsStorageException
+from runlength import merge_runs
+
+class SegmentException(Exception):
+    pass
+
+# segments for each worker, so that a long segment doesn't leave the others idle
+SEGMENTS_PER_PROCESS = 4
+
+# state shared with the worker processes, set before they are started
+_shared = {}
+
+def find_line_ends(data, start, block_size):
+    """yields the offsets of the ends of blocks of about block_size bytes of data, after a newline"""
+    size = len(data)
+    while start < size:
+        end = data.find('\n', min(start + block_size, size) - 1)
+        end = size if end == -1 else end + 1
+        yield end
+        start = end
+
+def scan_block(data, start, end, window):
+    """decodes and validates the lines of data[start:end].
+    Returns the maximum timestamp of the valid transactions (0 if there are none) and the candidate cut points:
+    the (<offset>, <timestamp>, <previous maximum>) of each valid transaction at least a window past
+    the maximum timestamp of the previous ones in the block.
+    """
+    lines = data[start:end].split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    validate = OpsStorage().validate
+    maximum = 0
+    candidates = []
+    offset = start
+    for line, message in zip(lines, decode_lines(lines)):
+        line_start = offset
+        offset += len(line) + 1
+        if message is None:
+            continue
+        try:
+            timestamp = validate(message)
+        except OpsStorageException:
+            continue
+        if timestamp - window >= maximum:
+            candidates.append((line_start, timestamp, maximum))
+        if timestamp > maximum:
+            maximum = timestamp
+    return maximum, candidates
+
+def cut_points(scanned_blocks, window):
+    """returns the offsets of the safe cut points from the scan_block results of consecutive blocks"""
+    cuts = []
+    maximum = 0
+    for block_maximum, candidates in scanned_blocks:
+        for offset, timestamp, previous_maximum in candidates:
+            if offset and timestamp - window >= max(maximum, previous_maximum):
+                cuts.append(offset)
+        maximum = max(maximum, block_maximum)
+    return cuts
+
+def split_segments(cuts, size, count):
+    """returns the (<start>, <end>) of at most count segments of a file of size bytes,
+    cut at the cut points closest to count equal parts.
+    """
+    bounds = [0]
+    for i in xrange(1, count):
+        position = bisect.bisect_left(cuts, size * i / count)
+        if position < len(cuts) and cuts[position] > bounds[-1]:
+            bounds.append(cuts[position])
+    bounds.append(size)
+    return zip(bounds[:-1], bounds[1:])
+
+def _scan_task(args):
+    start, end, window = args
+    return scan_block(_shared['data'], start, end, window)
+
+class _SegmentReader(object):
+    """input stream of the data between start and end, read without copying the rest of the segment"""
+    def __init__(self, data, start, end):
+        self.data = data
+        self.position = start
+        self.end = end
+
+    def read(self, size):
+        start = self.position
+        self.position = min(start + size, self.end)
+        return self.data[start:self.position]
+
+def _segment_task(args):
+    start, end = args
+    output = StringIO()
+    _shared['main'](_SegmentReader(_shared['data'], start, end), output, **_shared['kwargs'])
+    return output.getvalue()
+
+def run_segments(input_file, output_stream, processes, main, block_size=BLOCK_SIZE, **kwargs):
+    """writes to output_stream the output of main (rolling_median.main) on input_file, a regular file,
+    processing its independent segments in processes worker processes.
+    kwargs are passed to main, the window of the cut points is the longest one of kwargs['windows'].
+    With kwargs['runs'] the runs of consecutive segments are merged.
+    Returns the number of segments.
+    """
+    try:
+        regular = stat.S_ISREG(os.fstat(input_file.fileno()).st_mode)
+    except (AttributeError, IOError):
+        regular = False
+    if not regular:
+        raise SegmentException('the input must be a regular file to be split in segments')
+    window = max(kwargs.get('windows') or [OpsStorage.window])
+    try:
+        data = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # empty file
+        return 0
+    _shared.update(data=data, main=main, kwargs=kwargs)
+    pool = multiprocessing.Pool(processes)
+    try:
+        starts = [0] + list(find_line_ends(data, 0, block_size))
+        scanned = pool.map(_scan_task, [(start, end, window) for start, end in zip(starts[:-1], starts[1:])])
+        segments = split_segments(cut_points(scanned, window), len(data), processes * SEGMENTS_PER_PROCESS)
+        outputs = pool.imap(_segment_task, segments)
+        if kwargs.get('runs'):
+            outputs = merge_runs(outputs)
+        for output in outputs:
+            output_stream.write(output)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        _shared.clear()
+        data.close()
+    return len(segments)
@@ -0,0 +1,261 @@
+"""Long running service computing the rolling median of the transactions sent by several producers.
+Producers connect to the producer address and send json transactions, one per line.
+Subscribers connect to the subscriber address and receive the output of rolling_median, one line per transaction,
+from the moment they connect. An address is a localhost port or the path of a unix socket.
+
+The transactions of all the producers go through a bounded queue that is the input of rolling_median.main:
+the lines of a producer keep their order and the lines of different producers are processed in the order
+in which they are queued (OpsStorage accepts transactions out of order within the window).
+When the queue is full the producers wait: they stop reading from their sockets, so the senders are slowed down by TCP.
+main reads all the queued lines at once (up to block_size bytes), so the transactions are processed
+and their medians are written in batches. Each subscriber has a bounded queue of output batches
+and receives all the batches queued since its previous write in one write. A subscriber that can't keep up
+(its queue is full) is disconnected, so that it doesn't stop the service.
+If the processing fails, the producers are disconnected and stop re-raises its error.
+
+usage:
+    python src/streamservice.py [--producers <port or path>] [--subscribers <port or path>] [--window <seconds>]
+"""
+import sys
+import socket
+import argparse
+import threading
+import Queue
+import SocketServer
+
+import rolling_median
+
+# lines from the producers waiting to be processed
+QUEUE_SIZE = 1 << 14
+# output batches waiting to be sent to each subscriber
+SUBSCRIBER_QUEUE_SIZE = 1 << 10
+# maximum size of the input processed at once
+BLOCK_SIZE = 1 << 16
+# seconds between two checks of the state of the queue while waiting
+POLL_INTERVAL = 0.1
+
+class _ThreadingTCPServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class _ThreadingUnixServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+def _make_server(address, handler):
+    """returns a server on a localhost port if address is an int, on a unix socket if it is a path"""
+    if isinstance(address, (int, long)):
+        return _ThreadingTCPServer(('127.0.0.1', address), handler)
+    return _ThreadingUnixServer(address, handler)
+
+class TransactionQueue(object):
+    """Bounded queue of the input lines of all the producers, read by rolling_median.main as its input stream."""
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self.queue = Queue.Queue(maxsize)
+        self.closed = False
+        # the reader stopped, nothing empties the queue
+        self.failed = False
+
+    def put(self, line):
+        """queues a line ending with a newline, waiting while the queue is full.
+        Returns False if the queue is closed or its reader failed.
+        """
+        while not (self.closed or self.failed):
+            try:
+                self.queue.put(line, timeout=POLL_INTERVAL)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def close(self):
+        """the lines queued so far are read, then read returns an empty string"""
+        self.closed = True
+
+    def fail(self):
+        """releases the producers waiting on the queue when its reader stops"""
+        self.failed = True
+
+    def read(self, size):
+        """returns the queued lines, up to about size bytes, waiting for at least one"""
+        lines = []
+        length = 0
+        while length < size:
+            try:
+                # after the close only the queued lines are read
+                line = self.queue.get(not (lines or self.closed), POLL_INTERVAL)
+            except Queue.Empty:
+                if lines or self.closed:
+                    break
+                continue
+            lines.append(line)
+            length += len(line)
+        return ''.join(lines)
+
+class Subscribers(object):
+    """Output stream of rolling_median.main that queues each write for every subscriber."""
+
+    def __init__(self, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.queues = set()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.queues)
+
+    def subscribe(self):
+        """returns the queue of a new subscriber, a None in the queue means that the subscriber is disconnected"""
+        queue = Queue.Queue(self.maxsize)
+        with self.lock:
+            self.queues.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self.lock:
+            self.queues.discard(queue)
+
+    def write(self, text):
+        if not text:
+            return
+        with self.lock:
+            for queue in list(self.queues):
+                try:
+                    queue.put_nowait(text)
+                except Queue.Full:
+                    # too slow
+                    self._disconnect(queue)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """disconnects all the subscribers after their queued output"""
+        with self.lock:
+            for queue in list(self.queues):
+                try:
+                    queue.put_nowait(None)
+                except Queue.Full:
+                    self._disconnect(queue)
+
+    def _disconnect(self, queue):
+        """drops the queued output of a subscriber and disconnects it"""
+        self.queues.discard(queue)
+        with queue.mutex:
+            queue.queue.clear()
+        queue.put_nowait(None)
+
+class _ProducerHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        put = self.server.service.transactions.put
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            if not line.endswith('\n'):
+                line += '\n'
+            if not put(line):
+                break
+
+class _SubscriberHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        subscribers = self.server.service.subscribers
+        queue = subscribers.subscribe()
+        try:
+            while True:
+                batch = [queue.get()]
+                while batch[-1] is not None:
+                    try:
+                        batch.append(queue.get_nowait())
+                    except Queue.Empty:
+                        break
+                finished = batch[-1] is None
+                if finished:
+                    batch.pop()
+                self.wfile.write(''.join(batch))
+                self.wfile.flush()
+                if finished:
+                    break
+        except socket.error:
+            # the subscriber is gone
+            pass
+        finally:
+            subscribers.unsubscribe(queue)
+
+class StreamService(object):
+    """Runs rolling_median.main on the lines of the producers and sends its output to the subscribers.
+    Use port 0 to choose any free port (see producer_address and subscriber_address).
+    The other keyword arguments are passed to rolling_median.main (eg windows, MedianTrackerClass).
+    """
+
+    def __init__(self, producer_address, subscriber_address, queue_size=QUEUE_SIZE,
+            subscriber_queue_size=SUBSCRIBER_QUEUE_SIZE, block_size=BLOCK_SIZE, **kwargs):
+        self.transactions = TransactionQueue(queue_size)
+        self.subscribers = Subscribers(subscriber_queue_size)
+        self.block_size = block_size
+        self.kwargs = kwargs
+        self.producer_server = _make_server(producer_address, _ProducerHandler)
+        self.subscriber_server = _make_server(subscriber_address, _SubscriberHandler)
+        for server in (self.producer_server, self.subscriber_server):
+            server.service = self
+        self.producer_address = self.producer_server.server_address
+        self.subscriber_address = self.subscriber_server.server_address
+        self.processing_thread = None
+        self.error = None
+
+    def start(self):
+        """starts the servers and the processing in daemon threads"""
+        for target in (self.producer_server.serve_forever, self.subscriber_server.serve_forever, self._run):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+        self.processing_thread = thread
+
+    def _run(self):
+        try:
+            rolling_median.main(self.transactions, self.subscribers, block_size=self.block_size, **self.kwargs)
+        except Exception:
+            # re-raised by stop
+            self.error = sys.exc_info()
+            self.transactions.fail()
+        finally:
+            self.subscribers.close()
+
+    def stop(self):
+        """stops accepting transactions, processes the queued ones and disconnects the subscribers
+        after sending them the output. Re-raises the error of the processing if it failed.
+        """
+        self.producer_server.shutdown()
+        self.producer_server.server_close()
+        self.transactions.close()
+        self.processing_thread.join()
+        self.subscriber_server.shutdown()
+        self.subscriber_server.server_close()
+        if self.error is not None:
+            error_type, error, traceback = self.error
+            raise error_type, error, traceback
+
+    def wait(self):
+        """waits for the end of the processing"""
+        while self.processing_thread.is_alive():
+            # with a timeout, so that it can be interrupted
+            self.processing_thread.join(1)
+
+def _address(value):
+    return int(value) if value.isdigit() else value
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rolling median service.')
+    parser.add_argument('--producers', type=_address, default=9000,
+        help='localhost port or unix socket path on which the transactions are received')
+    parser.add_argument('--subscribers', type=_address, default=9001,
+        help='localhost port or unix socket path on which the medians are sent')
+    parser.add_argument('--window', type=int, action='append', dest='windows',
+        help='length in seconds of the sliding window (default 60), repeat the option for several windows')
+    args = parser.parse_args()
+    service = StreamService(args.producers, args.subscribers, windows=args.windows or [60])
+    service.start()
+    sys.stderr.write('producers on {}, subscribers on {}\n'.format(service.producer_address, service.subscriber_address))
+    try:
+        service.wait()
+    except KeyboardInterrupt:
+        pass
+    service.stop()
@@ -0,0 +1,72 @@
+import bisect
+
+class TopDegreeException(Exception):
+    pass
+
+class TopDegreeTracker(object):
+    """Class that tracks the nodes with the highest degrees, an observer of VenmoGraph (see VenmoGraph.add_observer).
+
+    The nodes are kept in a list for each degree (the property "buckets") and the position of each node
+    in its list is kept in "positions". A node is removed from its list moving the last node in its place.
+    The degrees with at least one node are kept sorted in "occupied_degrees", as in MedianTracker.
+    A degree change moves the node between two lists, a binary search is needed only when
+    a degree gets its first node or loses its last one.
+    The k nodes with the highest degrees are found walking the lists from the highest degree,
+    at most k lists are visited. The order of nodes with the same degree is arbitrary.
+    """
+
+    def __init__(self, k):
+        if k < 1:
+            raise TopDegreeException('invalid number of nodes {}'.format(k))
+        self.k = k
+        self.buckets = {}
+        self.positions = {}
+        self.occupied_degrees = []
+
+    def clear(self):
+        """removes all the nodes."""
+        self.buckets.clear()
+        self.positions.clear()
+        del self.occupied_degrees[:]
+
+    def receive_degrees(self, node_degrees):
+        """receives a list of (<node>, <degree_before>, <degree_after>)."""
+        buckets = self.buckets
+        positions = self.positions
+        for node, degree_before, degree_after in node_degrees:
+            if degree_before == degree_after:
+                continue
+            if degree_before:
+                bucket = buckets.get(degree_before)
+                position = positions.get(node)
+                if bucket is None or position is None or position >= len(bucket) or bucket[position] != node:
+                    raise TopDegreeException('{} does not have degree {}'.format(node, degree_before))
+                last = bucket.pop()
+                if last != node:
+                    bucket[position] = last
+                    positions[last] = position
+                if not bucket:
+                    del buckets[degree_before]
+                    occupied = self.occupied_degrees
+                    del occupied[bisect.bisect_left(occupied, degree_before)]
+            if degree_after:
+                bucket = buckets.get(degree_after)
+                if bucket is None:
+                    bucket = buckets[degree_after] = []
+                    bisect.insort(self.occupied_degrees, degree_after)
+                positions[node] = len(bucket)
+                bucket.append(node)
+            else:
+                del positions[node]
+
+    def top(self):
+        """returns the list of the (<node>, <degree>) of the k nodes with the highest degrees, highest first."""
+        top = []
+        k = self.k
+        buckets = self.buckets
+        for degree in reversed(self.occupied_degrees):
+            for node in buckets[degree][:k - len(top)]:
+                top.append((node, degree))
+            if len(top) == k:
+                break
+        return top
@@ -30,18 +30,60 @@ class VenmoGraph(object):
     This graph is fully connected as each node had at least one transaction with
     every other node.
     There were 2 transactions between "Caroline-Kaiser-2" and "Amber-Sauer".
+
+    Observers (see add_observer) are notified of the degree changes of each node.
     """
 
+    # number of obsolete messages above which they are counted by pair before updating the graph
+    BULK_EVICTION_SIZE = 64
+
     def __init__(self):
         self.graph = {}
+        # number of transactions in the graph, when they are all obsolete the graph is simply emptied
+        self.transaction_count = 0
+        self.observers = []
+        # tracker cleared when the graph is emptied (see reset_on_clear)
+        self.tracker = None
+
+    def reset_on_clear(self, tracker):
+        """when the graph is emptied, the clear method of tracker is called and update returns only
+        the updates of the nodes of the new messages, from degree 0, instead of a (<degree>, 0) update
+        for every node. tracker must be the one receiving the degree updates.
+        """
+        self.tracker = tracker
+
+    def add_observer(self, observer):
+        """adds an object that is notified of the degree changes of the nodes after each update.
+        The observer receive_degrees method receives a list of (<node>, <degree_before>, <degree_after>),
+        in which the degrees can be the same, and the clear method is called when the graph is emptied.
+        The nodes already in the graph are sent to the observer as new nodes.
+        If the observer has a receive_edges method, it receives before the degrees the list of
+        (<node>, <neighbor>, <timestamp>) of the new transactions and the list of (<node>, <neighbor>)
+        of the edges that have been removed (the timestamp is the one given to update).
+        """
+        observer.receive_degrees([(node, 0, self.degree(node)) for node in self.graph])
+        self.observers.append(observer)
+
+    def __getstate__(self):
+        # the observers are not part of the graph state (eg in a checkpoint)
+        state = dict(self.__dict__)
+        state.pop('observers', None)
+        state.pop('tracker', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.observers = []
+        self.tracker = None
 
-    def update(self, new_messages, obsolete_messages):
+    def update(self, new_messages, obsolete_messages, timestamp=None):
         """Updates the graph and return the list of degree updates (one for each modified node)
 
         inputs
         ---------
         additions: list of new messages (eg [{"created_time": "2014-03-27T04:28:20Z", "target": "Jamie-Korn", "actor": "Jordan-Gruber"}] )
         deletions: list of obsolete_messages (eg [{"created_time": "2014-03-27T04:26:00Z", "target": "Maryann-Berry", "actor": "Jamie-Korn"}, ...] )
+        timestamp: the timestamp of the new messages, only sent to the observers
 
         returns
         ---------
@@ -55,54 +97,147 @@ class VenmoGraph(object):
                 ...
             ]
         """
-        degrees_before = {}
-        for m in obsolete_messages:
-            try:
-                degree_before = len(self.graph[m['target']])
-                degrees_before[m['target']] = degree_before
-                degree_before = len(self.graph[m['actor']])
-                degrees_before[m['actor']] = degree_before
-            except KeyError as e:
-                raise VenmoException('{} does not exist in the graph'.format(e.args[0]))
-        for m in obsolete_messages:
-            self._handle_obsolete(m['target'], m['actor'])
-            self._handle_obsolete(m['actor'], m['target'])
+        graph = self.graph
+        degree = self.degree
+        degree_updates = []
+        cleared = obsolete_messages and len(obsolete_messages) == self.transaction_count
+        if cleared and self.tracker is not None:
+            # every transaction in the graph is obsolete, the tracker starts again from no nodes
+            self.tracker.clear()
+            graph.clear()
+            degrees_before = dict((node, 0) for m in new_messages for node in (m['target'], m['actor']))
+        elif cleared:
+            # every transaction in the graph is obsolete
+            degree_updates, degrees_before = self._clear(new_messages)
+        elif len(obsolete_messages) >= self.BULK_EVICTION_SIZE:
+            degrees_before = self._bulk_obsolete(obsolete_messages)
+        else:
+            degrees_before = {}
+            for m in obsolete_messages:
+                for node in (m['target'], m['actor']):
+                    if node not in graph:
+                        raise VenmoException('{} does not exist in the graph'.format(node))
+                    degrees_before[node] = degree(node)
+            for m in obsolete_messages:
+                self._handle_obsolete(m['target'], m['actor'])
+                self._handle_obsolete(m['actor'], m['target'])
         for  m in new_messages:
-            degrees_before[m['target']] = degrees_before.get(
-                m['target'],
-                len(self.graph.get(m['target'], []))
-            )
+            if m['target'] not in degrees_before:
+                degrees_before[m['target']] = degree(m['target'])
             self._handle_new(m['target'], m['actor'])
-            degrees_before[m['actor']] =  degrees_before.get(
-                m['actor'],
-                len(self.graph.get(m['actor'], []))
-            )
+            if m['actor'] not in degrees_before:
+                degrees_before[m['actor']] = degree(m['actor'])
             self._handle_new(m['actor'], m['target'])
+        self.transaction_count += len(new_messages) - len(obsolete_messages)
 
         # now that the operations have been performed we can compute all the degree updates
-        degree_updates = []
         for node, degree_before in degrees_before.iteritems():
-            degree_after = len(self.graph.get(node, []))
+            degree_after = degree(node)
             if degree_after != degree_before:
                 degree_updates.append((degree_before, degree_after))
+        if self.observers:
+            self._notify(degrees_before, cleared, new_messages, obsolete_messages, timestamp)
         return degree_updates
 
-    def _handle_obsolete(self, node, neighbor):
-        """handle an obsolete message by updating/deleting the node neighbor.
+    def _notify(self, degrees_before, cleared, new_messages, obsolete_messages, timestamp):
+        """sends the edge changes and the degree changes of the nodes in degrees_before to the observers."""
+        degree = self.degree
+        if cleared:
+            for observer in self.observers:
+                observer.clear()
+            node_degrees = [(node, 0, degree(node)) for node in degrees_before]
+            obsolete_messages = []
+        else:
+            node_degrees = [(node, degree_before, degree(node)) for node, degree_before in degrees_before.iteritems()]
+        edges = None
+        for observer in self.observers:
+            receive_edges = getattr(observer, 'receive_edges', None)
+            if receive_edges is not None:
+                if edges is None:
+                    new_edges = [(m['target'], m['actor'], timestamp) for m in new_messages]
+                    has_edge = self.has_edge
+                    removed_edges = [
+                        (m['target'], m['actor']) for m in obsolete_messages
+                        if not has_edge(m['target'], m['actor'])
+                    ]
+                    edges = (new_edges, removed_edges)
+                receive_edges(*edges)
+            observer.receive_degrees(node_degrees)
+
+    def _clear(self, new_messages):
+        """removes all the nodes from the graph.
+        Returns the degree updates of the removed nodes and the degrees before
+        of the nodes in new_messages, that are not in the degree updates.
+        """
+        degrees_before = {}
+        for m in new_messages:
+            for node in (m['target'], m['actor']):
+                degrees_before[node] = self.degree(node)
+        neighbors_degree = self._neighbors_degree
+        degree_updates = [
+            (neighbors_degree(neighbors), 0)
+            for node, neighbors in self.graph.iteritems()
+            if node not in degrees_before
+        ]
+        self.graph.clear()
+        return degree_updates, degrees_before
+
+    def _bulk_obsolete(self, obsolete_messages):
+        """handles many obsolete messages at once.
+        The messages are first counted for each (target, actor) pair, so that each pair
+        and each node is updated only once. Returns the degrees before the update.
+        """
+        graph = self.graph
+        degree = self.degree
+        pairs = {}
+        for m in obsolete_messages:
+            pair = (m['target'], m['actor'])
+            pairs[pair] = pairs.get(pair, 0) + 1
+        degrees_before = {}
+        for pair in pairs:
+            for node in pair:
+                if node not in degrees_before:
+                    if node not in graph:
+                        raise VenmoException('{} does not exist in the graph'.format(node))
+                    degrees_before[node] = degree(node)
+        for (target, actor), count in pairs.iteritems():
+            self._handle_obsolete(target, actor, count)
+            self._handle_obsolete(actor, target, count)
+        return degrees_before
+
+    def degree(self, node):
+        """returns the number of neighbors of node, 0 if it is not in the graph."""
+        return len(self.graph.get(node, ()))
+
+    def has_edge(self, node, neighbor):
+        """returns True if there is at least one transaction between node and neighbor."""
+        return neighbor in self.graph.get(node, ())
+
+    # degree of a node from its neighbors
+    _neighbors_degree = staticmethod(len)
+
+    def neighbors(self, node):
+        """returns the neighbors of node as a {<neighbor>: <transaction count>} dictionary."""
+        return dict(self.graph.get(node, {}))
+
+    def _handle_obsolete(self, node, neighbor, obsolete=1):
+        """handle "obsolete" obsolete messages by updating/deleting the node neighbor.
         """
         neighbors = self.graph[node]
         try:
             count = neighbors[neighbor]
         except KeyError:
             raise VenmoException('{} does not have {} as neighbor'.format(node, neighbor))
-        if count == 1:
+        if count == obsolete:
             neighbors.pop(neighbor)
             if len(neighbors) == 0:
                 self.graph.pop(node)
-        else:
+        elif count > obsolete:
             # we don't delete the neighbor here as there
             # was at least one recent transaction.
-            neighbors[neighbor] = count - 1
+            neighbors[neighbor] = count - obsolete
+        else:
+            raise VenmoException('{} does not have {} transactions with {}'.format(node, obsolete, neighbor))
 
     def _handle_new(self, node, neighbor):
         """add/update a node neighbor.
@@ -0,0 +1,90 @@
+"""Tests for checkpoints of the rolling_median state.
+"""
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+from nose import with_setup
+from nose.tools import assert_equals, assert_raises
+import checkpoint
+import rolling_median
+import tracker_util
+
+_globals = {}
+
+def setup_dir():
+    _globals['dir'] = tempfile.mkdtemp()
+
+def teardown_dir():
+    shutil.rmtree(_globals['dir'])
+
+_input = ''.join(
+    tracker_util.transaction_line(i, i % 7, (i * 3) % 11) for i in xrange(0, 400, 3)
+)
+
+def _run(input_text, output, path, **kwargs):
+    rolling_median.main(StringIO(input_text), output, checkpoint_path=path,
+        checkpoint_interval=10, block_size=256, **kwargs)
+
+@with_setup(setup_dir, teardown_dir)
+def test_resume():
+    """tests that a run resumed from a checkpoint has the same output of a single run"""
+    expected = StringIO()
+    rolling_median.main(StringIO(_input), expected)
+    path = os.path.join(_globals['dir'], 'checkpoint')
+    output = StringIO()
+    _run(_input[:len(_input) / 2], output, path)
+    # output written after the checkpoint is discarded
+    output.write('1.00\n')
+    _run(_input, output, path)
+    assert_equals(output.getvalue(), expected.getvalue())
+
+def test_rebuild_tracker():
+    """tests that trackers without from_degrees are rebuilt with degree updates"""
+    class ReplayedTracker(tracker_util.SimpleMedianTracker):
+        from_degrees = None
+    tracker = checkpoint.rebuild_tracker(tracker_util.SimpleMedianTracker, {1: 2, 3: 1})
+    assert_equals(tracker.degree_list, [1, 1, 3])
+    tracker = checkpoint.rebuild_tracker(ReplayedTracker, {1: 2, 3: 1})
+    assert_equals(sorted(tracker.degree_list), [1, 1, 3])
+
+@with_setup(setup_dir, teardown_dir)
+def test_resume_components():
+    """tests that the components are rebuilt from the window of a checkpoint"""
+    expected = StringIO()
+    rolling_median.main(StringIO(_input), expected, components=True)
+    path = os.path.join(_globals['dir'], 'checkpoint')
+    output = StringIO()
+    _run(_input[:len(_input) / 2], output, path, components=True)
+    _run(_input, output, path, components=True)
+    assert_equals(output.getvalue(), expected.getvalue())
+
+@with_setup(setup_dir, teardown_dir)
+def test_resume_cut_line():
+    """tests that a last line without newline is read again when the run is resumed"""
+    expected = StringIO()
+    rolling_median.main(StringIO(_input), expected)
+    cut = len(_input) / 2 + 10
+    assert _input[cut - 1] != '\n'
+    # block, line and parallel reads
+    for i, kwargs in enumerate([{}, {'block_size': 0}, {'processes': 2}]):
+        path = os.path.join(_globals['dir'], 'checkpoint-{}'.format(i))
+        output = StringIO()
+        options = dict({'checkpoint_interval': 10, 'block_size': 256}, **kwargs)
+        rolling_median.main(StringIO(_input[:cut]), output, checkpoint_path=path, **options)
+        rolling_median.main(StringIO(_input), output, checkpoint_path=path, **options)
+        assert_equals(output.getvalue(), expected.getvalue())
+    # a complete last line without newline is processed once
+    path = os.path.join(_globals['dir'], 'checkpoint-complete')
+    output = StringIO()
+    _run(_input[:-1], output, path)
+    _run(_input, output, path)
+    assert_equals(output.getvalue(), expected.getvalue())
+
+@with_setup(setup_dir, teardown_dir)
+def test_resume_top():
+    """tests that the top users, whose order is not saved, can't be written with checkpoints"""
+    path = os.path.join(_globals['dir'], 'checkpoint')
+    assert_raises(checkpoint.CheckpointException, _run, _input, StringIO(), path, top=3)
+    assert not os.path.exists(path)
+    assert_raises(SystemExit, rolling_median.parse_args, ['--top', '3', '--checkpoint', path])
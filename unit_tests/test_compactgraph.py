@@ -0,0 +1,44 @@
+"""Tests for CompactVenmoGraph operations.
+The compact graph must return the same degree updates as VenmoGraph.
+"""
+import random
+from nose.tools import assert_equals, assert_raises
+import compactgraph
+import venmograph
+from tracker_util import message
+
+def test_inline_and_hub_nodes():
+    """tests the switch between the inline list and the dictionary of a hub"""
+    graph = compactgraph.CompactVenmoGraph()
+    hub = 'Amber-Sauer'
+    messages = [message(hub, 'user-{}'.format(i)) for i in xrange(6)]
+    updates = []
+    for m in messages:
+        updates += graph.update([m], [])
+    assert_equals(type(graph.graph[hub]), dict)
+    assert_equals(graph.degree(hub), 6)
+    assert_equals(type(graph.graph['user-0']), list)
+    assert_equals(graph.neighbors('user-0'), {hub: 1})
+    assert_equals(sorted(graph.update([], messages[:4])), [(1, 0)] * 4 + [(6, 2)])
+    assert_equals(type(graph.graph[hub]), list)
+    assert_equals(graph.neighbors(hub), {'user-4': 1, 'user-5': 1})
+    assert_raises(venmograph.VenmoException, graph.update, [], messages[:1])
+
+def test_same_updates_as_venmograph():
+    """tests random sequences of transactions on both graphs"""
+    def exec_test(seed):
+        rand = random.Random(seed)
+        graph = venmograph.VenmoGraph()
+        compact = compactgraph.CompactVenmoGraph()
+        window = []
+        for _ in xrange(500):
+            new_messages = [message(rand.randint(0, 3), rand.randint(0, 30))]
+            obsolete_messages = [window.pop(0) for _ in xrange(rand.randint(0, min(3, len(window))))]
+            window += new_messages
+            expected = graph.update(new_messages, obsolete_messages)
+            assert_equals(sorted(compact.update(new_messages, obsolete_messages)), sorted(expected))
+        for node in graph.graph:
+            assert_equals(compact.neighbors(node), graph.neighbors(node))
+        assert_equals(set(compact.graph), set(graph.graph))
+    for seed in xrange(5):
+        yield exec_test, seed
@@ -0,0 +1,89 @@
+"""Tests for the ComponentTracker, observer of the graph.
+The components are compared with the ones found by a breadth first search of the graph.
+"""
+import random
+from StringIO import StringIO
+from nose.tools import assert_equals, assert_raises
+from compactgraph import CompactVenmoGraph
+from components import ComponentTracker, ComponentException
+from interner import NameInterner
+from opsstorage import OpsStorage
+from venmograph import VenmoGraph
+import rolling_median
+
+def _bfs_components(graph):
+    """returns the sorted list of the component sizes"""
+    sizes = []
+    seen = set()
+    for start in graph.graph:
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = [start]
+        for node in queue:
+            for neighbor in graph.neighbors(node):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        sizes.append(len(queue))
+    return sorted(sizes)
+
+def _check(components, graph):
+    sizes = _bfs_components(graph)
+    assert_equals(components.count, len(sizes))
+    assert_equals(components.largest(), max(sizes) if sizes else 0)
+    expected = {}
+    for size in sizes:
+        expected[size] = expected.get(size, 0) + 1
+    assert_equals(components.sizes, expected)
+
+def test_components():
+    """tests random transactions, out of order, with bulk evictions and jumps that empty the graph"""
+    def exec_test(GraphClass, seed):
+        rand = random.Random(seed)
+        ops = OpsStorage(NameInterner(), window=10)
+        graph = GraphClass()
+        graph.BULK_EVICTION_SIZE = 4
+        components = ComponentTracker()
+        graph.add_observer(components)
+        timestamp = 0
+        for i in xrange(600):
+            if i % 150 == 149:
+                timestamp += 30
+            else:
+                timestamp += rand.choice([0, 0, 1, 1, 2])
+            message = {'actor': rand.randint(0, 25), 'target': rand.randint(0, 25)}
+            t = timestamp - rand.randint(0, 12)
+            new_messages, obsolete_messages = ops.add(message, t)
+            graph.update(new_messages, obsolete_messages, t)
+            _check(components, graph)
+    for GraphClass in (VenmoGraph, CompactVenmoGraph):
+        for seed in xrange(5):
+            yield exec_test, GraphClass, seed
+
+def test_component_size():
+    """tests the size of the component of a node"""
+    components = ComponentTracker()
+    components.add_edge('a', 'b', 1)
+    components.add_edge('b', 'c', 2)
+    components.add_edge('d', 'e', 2)
+    assert_equals(components.component_size('a'), 3)
+    assert_equals(components.component_size('e'), 2)
+    assert_equals(components.component_size('f'), 0)
+    assert_equals((components.count, components.largest()), (2, 3))
+    components.remove_edge('a', 'b')
+    components.receive_degrees([('a', 1, 0)])
+    assert_equals((components.count, components.largest()), (2, 2))
+    assert_raises(ComponentException, components.receive_degrees, [('b', 1, 0)])
+
+def test_rolling_median_columns():
+    """tests the components columns of rolling_median"""
+    input_text = ''.join(
+        '{{"created_time": "2016-03-28T23:23:{:02d}Z", "target": "user-{}", "actor": "user-{}"}}\n'.format(*m)
+        for m in [(0, 1, 2), (1, 3, 4), (2, 2, 3), (50, 5, 6)]
+    ) + '{"created_time": "2016-03-28T23:24:01Z", "target": "user-5", "actor": "user-7"}\n'
+    output = StringIO()
+    rolling_median.main(StringIO(input_text), output, components=True)
+    assert_equals(output.getvalue().splitlines(), [
+        '1.00 1 2', '1.00 2 2', '1.50 1 4', '1.00 2 4', '1.00 2 3'
+    ])
@@ -0,0 +1,76 @@
+"""Tests for the FenwickMedianTracker operations.
+The medians are compared with the ones of the simpler implementation in tracker_util.
+"""
+import random
+from nose.tools import assert_equals, assert_raises
+from fenwicktracker import FenwickMedianTracker
+from mediantracker import MedianTrackerException
+import tracker_util
+
+def _random_updates(rand, count):
+    """generates random valid degree updates"""
+    degree_list = []
+    for _ in xrange(count):
+        r = rand.random()
+        if not degree_list or r < 0.3:
+            degree_list.append(1)
+            yield (0, 1)
+        else:
+            i = rand.randrange(len(degree_list))
+            degree = degree_list[i]
+            if r < 0.45:
+                degree_list.pop(i)
+                yield (degree, 0)
+            elif r < 0.8 or degree == 1:
+                degree_list[i] = degree + 1
+                yield (degree, degree + 1)
+            else:
+                degree_list[i] = rand.randint(1, degree - 1)
+                yield (degree, degree_list[i])
+
+def test_same_medians():
+    """tests random updates against SimpleMedianTracker, also growing the tree"""
+    def exec_test(seed):
+        rand = random.Random(seed)
+        tracker = FenwickMedianTracker()
+        tracker.tree = [0] * 3
+        expected = tracker_util.SimpleMedianTracker()
+        for update in _random_updates(rand, 2000):
+            tracker.receive(update)
+            expected.receive(update)
+            assert_equals(tracker.median(), expected.median())
+        assert_equals(tracker.degrees, expected.degrees)
+        rebuilt = FenwickMedianTracker.from_degrees(tracker.degrees)
+        assert_equals(rebuilt.median(), tracker.median())
+    for seed in xrange(5):
+        yield exec_test, seed
+
+def test_invalid_updates():
+    """tests that invalid updates are rejected"""
+    tracker = FenwickMedianTracker()
+    tracker.receive((0, 1))
+    for update in [(0, 2), (1, 3), (2, 1), (2, 0)]:
+        yield assert_raises, MedianTrackerException, tracker.receive, update
+
+def test_receive_batch():
+    """tests batches of updates against SimpleMedianTracker"""
+    def exec_test(seed):
+        rand = random.Random(seed)
+        degree_list = [rand.randint(1, 100) for _ in xrange(rand.randint(0, 60))]
+        degrees = {}
+        for degree in degree_list:
+            degrees[degree] = degrees.get(degree, 0) + 1
+        tracker = FenwickMedianTracker.from_degrees(degrees)
+        expected = tracker_util.SimpleMedianTracker.from_degrees(degrees)
+        for _ in xrange(20):
+            updates = tracker_util.random_batch(rand, degree_list, rand.randint(0, 40))
+            tracker.receive_batch(updates)
+            expected.receive_batch(updates)
+            assert_equals(tracker.degrees, expected.degrees)
+            assert_equals(tracker.size, len(expected.degree_list))
+            if expected.degree_list:
+                assert_equals(tracker.median(), expected.median())
+    for seed in xrange(10):
+        yield exec_test, seed
+    tracker = FenwickMedianTracker()
+    yield assert_raises, MedianTrackerException, tracker.receive_batch, [(0, 1), (2, 0)]
@@ -0,0 +1,58 @@
+"""Tests for the block reading and decoding of the input.
+"""
+import json
+from StringIO import StringIO
+import ingestion
+
+_lines = [
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": "Raffi-Antilian"}',
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": ""}',
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "", "actor": "Amber-Sauer"}',
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": "", "actor": "Raffi-Antilian"}',
+    '  {"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": "Raffi-Antilian"} \r',
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": "Raffi-Antilian"} {}',
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": "Raffi-Antilian"',
+    '',
+    'not json'
+]
+
+def test_iter_blocks():
+    """tests that lines are not broken across blocks"""
+    def exec_test(block_size, text):
+        blocks = list(ingestion.iter_blocks(StringIO(text), block_size))
+        expected = text.split('\n')
+        if text.endswith('\n'):
+            expected.pop()
+        assert [l for b in blocks for l in b] == expected
+    text = '\n'.join(_lines)
+    for block_size in [1, 7, 100, 1 << 20]:
+        yield exec_test, block_size, text
+        yield exec_test, block_size, text + '\n'
+
+def test_iter_terminated_blocks():
+    """tests that only a last line without newline is marked as unterminated"""
+    text = '\n'.join(_lines[:3])
+    for block_size in [1, 100, 1 << 20]:
+        blocks = list(ingestion.iter_terminated_blocks(StringIO(text), block_size))
+        assert blocks[-1] == ([_lines[2]], False)
+        assert all(terminated for _, terminated in blocks[:-1])
+        blocks = list(ingestion.iter_terminated_blocks(StringIO(text + '\n'), block_size))
+        assert all(terminated for _, terminated in blocks)
+
+def test_decode_lines():
+    """tests that decoding is the same as json.loads for valid lines"""
+    messages = ingestion.decode_lines(_lines)
+    for line, message in zip(_lines, messages):
+        try:
+            expected = json.loads(line)
+        except ValueError:
+            expected = None
+        if ingestion.is_rejected(line):
+            assert message is None
+            assert expected is not None and not (expected['actor'] and expected['target'])
+        else:
+            assert message == expected, '{} != {}'.format(message, expected)
+
+def test_is_rejected():
+    """tests the cheap rejection of lines with empty fields"""
+    assert [ingestion.is_rejected(l) for l in _lines[:4]] == [False, True, True, False]
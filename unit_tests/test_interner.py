@@ -0,0 +1,28 @@
+"""Tests for NameInterner operations.
+"""
+from nose.tools import assert_equals, assert_raises
+import interner
+
+def test_intern():
+    """tests that the same name gets the same id"""
+    names = interner.NameInterner()
+    assert_equals(names.intern('Amber-Sauer'), 0)
+    assert_equals(names.intern('Raffi-Antilian'), 1)
+    assert_equals(names.intern('Amber-Sauer'), 0)
+    assert_equals(names.refcounts, [2, 1])
+    assert_equals(names.name(1), 'Raffi-Antilian')
+
+def test_release():
+    """tests that ids are freed when not referenced and then reused"""
+    names = interner.NameInterner()
+    names.intern('Amber-Sauer')
+    names.intern('Raffi-Antilian')
+    names.intern('Amber-Sauer')
+    names.release(0)
+    assert_equals(names.name(0), 'Amber-Sauer')
+    names.release(0)
+    assert_equals(len(names), 1)
+    assert_raises(interner.InternerException, names.name, 0)
+    assert_raises(interner.InternerException, names.release, 0)
+    assert_equals(names.intern('Caroline-Kaiser-2'), 0)
+    assert_equals(names.intern('charlotte-macfarlane'), 2)
@@ -0,0 +1,48 @@
+"""Tests for the latency histograms and the metrics reports of rolling_median.
+"""
+import json
+from StringIO import StringIO
+from nose.tools import assert_equals, assert_almost_equals
+from metrics import LatencyHistogram
+import rolling_median
+
+def test_latency_histogram():
+    """tests the percentiles of the latency histogram"""
+    latency = LatencyHistogram()
+    assert_equals(latency.percentile(50), 0)
+    for i in xrange(1, 101):
+        latency.add(i * 1e-4)
+    summary = latency.summary()
+    assert_equals(summary['count'], 100)
+    assert_almost_equals(summary['mean'], 50.5e-4)
+    assert_equals(summary['max'], 1e-2)
+    assert 50e-4 <= summary['p50'] <= 55e-4, summary['p50']
+    assert 99e-4 <= summary['p99'] <= 1e-2, summary['p99']
+
+def test_rolling_median_metrics():
+    """tests that the metrics report covers every stage and window"""
+    input_text = ''.join(
+        '{{"created_time": "2016-03-28T23:23:{:02d}Z", "target": "user-{}", "actor": "user-0"}}\n'.format(i, i + 1)
+        for i in xrange(20)
+    )
+    output = StringIO()
+    metrics_stream = StringIO()
+    rolling_median.main(StringIO(input_text), output, windows=[60, 5], block_size=256,
+        metrics_stream=metrics_stream, metrics_interval=3600)
+    reports = [json.loads(line) for line in metrics_stream.getvalue().splitlines()]
+    assert_equals(len(reports), 1)
+    report = reports[0]
+    assert_equals(report['lines'], 20)
+    assert_equals(sorted(report['stages']), [
+        'decode', 'graph.5', 'graph.60', 'ops.5', 'ops.60', 'tracker.5', 'tracker.60', 'write'
+    ])
+    assert_equals(report['stages']['graph.60']['count'], 20)
+    assert_equals(report['stages']['write']['count'], report['stages']['decode']['count'])
+    assert_equals(report['sizes']['60'], {
+        'transactions': 20, 'late_transactions': 0, 'nodes': 21, 'edges': 20,
+        'distinct_degrees': 2, 'linked_list_nodes': 23
+    })
+    assert_equals(report['sizes']['5']['transactions'], 5)
+    expected = StringIO()
+    rolling_median.main(StringIO(input_text), expected, windows=[60, 5])
+    assert_equals(output.getvalue(), expected.getvalue())
@@ -1,5 +1,6 @@
 """Tests for OpsStorage operations.
 """
+import interner
 import opsstorage
 from nose import with_setup
 from nose.tools import assert_raises
@@ -79,3 +80,143 @@ def test_message_timing():
     yield (
         exec_test, messages[3], [messages[3]], [], timestamp
     )
+
+def test_seconds_since_epoch():
+    """tests that the fast timestamp parser agrees with strptime"""
+    def exec_test(created_time):
+        expected = opsstorage._strict_seconds_since_epoch(created_time)
+        assert opsstorage.seconds_since_epoch(created_time) == expected, (
+            '{} != {}'.format(opsstorage.seconds_since_epoch(created_time), expected)
+        )
+    timestamps = [
+        '1970-01-01T00:00:00Z',
+        '2016-02-29T23:59:59Z', # leap day
+        '2016-03-28T23:23:12Z',
+        u'2016-03-28T23:23:12Z',
+        '2016-3-28T1:2:3Z' # not canonical, accepted by strptime
+    ]
+    for created_time in timestamps:
+        yield exec_test, created_time
+
+def test_invalid_timestamps():
+    """tests that invalid timestamps are rejected also when cached values exist"""
+    storage = opsstorage.OpsStorage()
+    storage.get_update({'created_time': '2016-03-28T23:23:12Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'})
+    invalid_timestamps = [
+        '', '2015-02-29T00:00:00Z', '2016-13-28T23:23:12Z', '2016-03-28T24:23:12Z',
+        '2016-03-28T23:60:12Z', '2016-03-28T23:23:60Z', '2016-03-28T23:23:12', ' 2016-03-28T23:23:12Z'
+    ]
+    for created_time in invalid_timestamps:
+        msg = {'created_time': created_time, 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+        yield assert_raises, opsstorage.OpsStorageException, storage.get_update, msg
+
+def test_interned_messages():
+    """tests that with an interner names are replaced by ids released when obsolete"""
+    names = interner.NameInterner()
+    storage = opsstorage.OpsStorage(names)
+    msg_1 = {'created_time': '2016-03-28T23:23:12Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+    msg_2 = {'created_time': '2016-03-28T23:24:12Z', 'target': 'Amber-Sauer', 'actor': 'Caroline-Kaiser-2'}
+    new_messages, obsolete_messages = storage.get_update(msg_1)
+    assert new_messages == [{'actor': 0, 'target': 1}]
+    new_messages, obsolete_messages = storage.get_update(dict(msg_2, created_time='2016-03-28T23:23:40Z'))
+    assert new_messages == [{'actor': 2, 'target': 1}]
+    msg_3 = {'created_time': '2016-03-28T23:24:20Z', 'target': 'Amber-Sauer', 'actor': 'charlotte-macfarlane'}
+    new_messages, obsolete_messages = storage.get_update(msg_3)
+    assert new_messages == [{'actor': 3, 'target': 1}]
+    assert obsolete_messages == [{'actor': 0, 'target': 1}]
+    # the id of the obsolete actor is released, Amber-Sauer is still in the window
+    assert len(names) == 3
+    assert names.free_ids == [0]
+    assert names.name(1) == 'Amber-Sauer'
+
+def test_interner_cleared():
+    """tests that the interner is emptied at once when the whole window is obsolete, unless it is shared"""
+    names = interner.NameInterner()
+    storage = opsstorage.OpsStorage(names)
+    msg_1 = {'created_time': '2016-03-28T23:23:12Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+    msg_2 = {'created_time': '2016-03-28T23:24:12Z', 'target': 'Amber-Sauer', 'actor': 'Caroline-Kaiser-2'}
+    storage.get_update(msg_1)
+    storage.get_update(dict(msg_1, actor='Caroline-Kaiser-2'))
+    new_messages, obsolete_messages = storage.get_update(msg_2)
+    assert len(obsolete_messages) == 2
+    # the ids are given again from 0
+    assert new_messages == [{'actor': 0, 'target': 1}]
+    assert names.names == ['Caroline-Kaiser-2', 'Amber-Sauer']
+    assert names.free_ids == []
+    # another storage keeps its names
+    other = opsstorage.OpsStorage(names, window=3600)
+    other.get_update(msg_1)
+    new_messages, obsolete_messages = storage.get_update(dict(msg_1, created_time='2016-03-29T01:00:00Z'))
+    assert new_messages == [{'actor': 2, 'target': 1}]
+    assert names.free_ids == [0]
+
+def test_ring_buffer():
+    """tests that the buckets of the ring are emptied and reused"""
+    storage = opsstorage.OpsStorage()
+    msg_1 = {'created_time': '2016-03-28T23:23:12Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+    msg_2 = {'created_time': '2016-03-28T23:23:13Z', 'target': 'Amber-Sauer', 'actor': 'Caroline-Kaiser-2'}
+    msg_3 = {'created_time': '2016-03-28T23:24:12Z', 'target': 'Amber-Sauer', 'actor': 'charlotte-macfarlane'}
+    msg_4 = {'created_time': '2016-03-29T05:00:00Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+    storage.get_update(msg_1)
+    storage.get_update(msg_2)
+    buckets = list(storage.buckets)
+    # msg_3 takes the bucket of msg_1
+    assert storage.get_update(msg_3) == ([msg_3], [msg_1])
+    assert storage.buckets[1459207392 % 60] == [msg_3]
+    assert storage.occupied == [1459207393, 1459207452]
+    # a jump of hours empties the whole window
+    new_messages, obsolete_messages = storage.get_update(msg_4)
+    assert sorted(obsolete_messages) == sorted([msg_2, msg_3])
+    assert storage.occupied == [1459227600]
+    assert sum(len(b) for b in storage.buckets) == 1
+    assert all(a is b for a, b in zip(buckets, storage.buckets))
+    # a late message is not stored
+    assert storage.get_update(msg_1) == ([], [])
+    assert sum(len(b) for b in storage.buckets) == 1
+
+def test_late_messages():
+    """tests that late messages are counted and only kept in the audit buffer"""
+    def exec_test(late_buffer_size, expected_dropped, expected_kept):
+        storage = opsstorage.OpsStorage(late_buffer_size=late_buffer_size)
+        storage.get_update({'created_time': '2016-03-28T23:24:12Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'})
+        late = [
+            {'created_time': '2016-03-28T23:23:1{}Z'.format(i), 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+            for i in xrange(3)
+        ]
+        for msg in late:
+            assert storage.get_update(msg) == ([], [])
+        assert storage.late_count == 3
+        assert storage.late_dropped == expected_dropped
+        assert [m for _, m in storage.late_messages] == late[3 - expected_kept:]
+        assert sum(len(b) for b in storage.buckets) == 1
+    yield exec_test, 0, 3, 0
+    yield exec_test, 2, 1, 2
+    yield exec_test, 5, 0, 3
+
+def test_window_length():
+    """tests a storage with a window of 10 seconds"""
+    storage = opsstorage.OpsStorage(window=10)
+    msg_1 = {'created_time': '2016-03-28T23:23:12Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+    msg_2 = {'created_time': '2016-03-28T23:23:21Z', 'target': 'Amber-Sauer', 'actor': 'Caroline-Kaiser-2'}
+    msg_3 = {'created_time': '2016-03-28T23:23:22Z', 'target': 'Amber-Sauer', 'actor': 'charlotte-macfarlane'}
+    assert storage.get_update(msg_1) == ([msg_1], [])
+    assert storage.get_update(msg_2) == ([msg_2], [])
+    assert storage.get_update(msg_3) == ([msg_3], [msg_1])
+    assert storage.get_update(msg_1) == ([], [])
+    assert len(storage.buckets) == 10
+
+def test_advance():
+    """tests moving the window forward without a transaction"""
+    storage = opsstorage.OpsStorage(window=10)
+    msg_1 = {'created_time': '2016-03-28T23:23:12Z', 'target': 'Amber-Sauer', 'actor': 'Raffi-Antilian'}
+    msg_2 = {'created_time': '2016-03-28T23:23:15Z', 'target': 'Amber-Sauer', 'actor': 'Caroline-Kaiser-2'}
+    storage.get_update(msg_1)
+    storage.get_update(msg_2)
+    timestamp = storage.max_timestamp
+    assert storage.advance(timestamp - 1) == []
+    assert storage.advance(timestamp + 7) == [msg_1]
+    assert storage.max_timestamp == timestamp + 7
+    # older than the new window
+    assert storage.get_update(msg_1) == ([], [])
+    assert storage.advance(timestamp + 100) == [msg_2]
+    assert storage.occupied == []
@@ -0,0 +1,36 @@
+"""Tests for the compiled transaction format.
+"""
+import tempfile
+from StringIO import StringIO
+from nose.tools import assert_equals, assert_raises
+import packedtrans
+
+_input = '\n'.join([
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": "Raffi-Antilian"}',
+    '{"created_time": "2016-03-28T23:23:12Z", "target": "Amber-Sauer", "actor": ""}',
+    'not json',
+    '{"created_time": "not valid", "target": "Amber-Sauer", "actor": "Raffi-Antilian"}',
+    '{"created_time": "2016-03-28T23:23:13Z", "target": "Caroline-Kaiser-2", "actor": "Amber-Sauer"}'
+])
+
+def test_compile_and_read():
+    """tests that only valid transactions are compiled and read back"""
+    output_file = tempfile.TemporaryFile()
+    names_file = StringIO()
+    count = packedtrans.compile_transactions(StringIO(_input), output_file, names_file)
+    output_file.flush()
+    assert_equals(count, 2)
+    names_file.seek(0)
+    assert_equals(packedtrans.load_names(names_file), ['Raffi-Antilian', 'Amber-Sauer', 'Caroline-Kaiser-2'])
+    packed = packedtrans.PackedTransactions(output_file)
+    assert_equals(len(packed), 2)
+    blocks = list(packed.iter_blocks(1))
+    assert_equals(blocks, [(8, [(1459207392, 0, 1)]), (20, [(1459207393, 1, 2)])])
+    assert_equals(list(packed.iter_blocks(offset=20)), [(20, [(1459207393, 1, 2)])])
+
+def test_invalid_file():
+    """tests that files not compiled are rejected"""
+    f = tempfile.TemporaryFile()
+    f.write('{"created_time": "2016-03-28T23:23:12Z"}')
+    f.flush()
+    assert_raises(packedtrans.PackedTransactionsException, packedtrans.PackedTransactions, f)
@@ -0,0 +1,62 @@
+"""Tests for the decoding of the input in worker processes.
+"""
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+from nose.tools import assert_equals
+import parallelparse
+import rolling_median
+from opsstorage import OpsStorage
+from tracker_util import transaction_line
+
+_input = ''.join(
+    transaction_line(i, i % 7, (i * 3) % 11) if i % 50 else '{"created_time": "2016-03-28T23:23:12Z", "target": "", "actor": "user-1"}\nnot json\n'
+    for i in xrange(0, 500, 2)
+)
+
+def _compact(blocks):
+    """the transactions of the blocks with only the actor and the target in the message"""
+    return [
+        (offset, [(line, timestamp, {'actor': m['actor'], 'target': m['target']}) for line, timestamp, m in block])
+        for offset, block in blocks
+    ]
+
+def test_parse_lines():
+    """tests that the lengths and the valid transactions are the ones of a single process, without the lines by default"""
+    lines = _input.splitlines()
+    length, transactions = parallelparse.parse_lines(lines)
+    assert_equals(length, len(_input))
+    expected = _compact(rolling_median.iter_json_transactions(StringIO(_input), OpsStorage()))
+    assert_equals([(t[1], {'actor': t[2], 'target': t[3]}) for t in transactions],
+        [(t[1], t[2]) for _, block in expected for t in block])
+    assert all(t[0] is None for t in transactions)
+    _, transactions = parallelparse.parse_lines(lines, keep_lines=True)
+    assert_equals([t[0] for t in transactions], [t[0] for _, block in expected for t in block])
+
+def test_iter_parallel_transactions():
+    """tests that the blocks are in the input order, with the same offsets of a single process"""
+    expected = _compact(rolling_median.iter_json_transactions(StringIO(_input), OpsStorage(), block_size=300))
+    blocks = list(parallelparse.iter_parallel_transactions(StringIO(_input), 3, 300, keep_lines=True))
+    assert_equals(blocks, expected)
+
+def test_rolling_median_processes():
+    """tests that the output is the same of a single process, also resuming from a checkpoint"""
+    expected = StringIO()
+    rolling_median.main(StringIO(_input), expected, debug=True)
+    output = StringIO()
+    rolling_median.main(StringIO(_input), output, debug=True, block_size=256, processes=2)
+    assert_equals(output.getvalue(), expected.getvalue())
+    expected = StringIO()
+    rolling_median.main(StringIO(_input), expected)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'checkpoint')
+        output = StringIO()
+        rolling_median.main(StringIO(_input[:len(_input) / 2]), output, block_size=256, processes=2,
+            checkpoint_path=path, checkpoint_interval=10)
+        rolling_median.main(StringIO(_input), output, block_size=256, processes=2,
+            checkpoint_path=path, checkpoint_interval=10)
+        assert_equals(output.getvalue(), expected.getvalue())
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,91 @@
+"""Tests for the rolling medians of partitions.
+"""
+from StringIO import StringIO
+from nose.tools import assert_equals
+import partitions
+import rolling_median
+from fenwicktracker import FenwickMedianTracker
+
+def _line(seconds, target, actor, region):
+    return ('{{"created_time": "2016-03-28T23:{:02d}:{:02d}Z", "target": "user-{}", "actor": "user-{}", '
+        '"region": {}}}\n').format(seconds / 60, seconds % 60, target, actor, region)
+
+def test_interleaved():
+    """tests that the medians of partitions with transactions at the same times are the ones of separate runs"""
+    lines = [
+        _line(i / 3, (i * 7) % (5 + region), (i * 3) % (7 + region), '"r{}"'.format(region) if region else 0)
+        for i in xrange(900) for region in xrange(3)
+    ]
+    # no key
+    lines.insert(10, '{"created_time": "2016-03-28T23:00:05Z", "target": "user-1", "actor": "user-2"}\n')
+    output = StringIO()
+    result = partitions.main(StringIO(''.join(lines)), output, 'region', block_size=1000)
+    output_lines = output.getvalue().splitlines()
+    assert_equals(len(output_lines), 2700)
+    for region in ['r1', 'r2', '0']:
+        expected = StringIO()
+        rolling_median.main(StringIO(''.join(l for l in lines if '"region": {}'.format(region) in l
+            or '"region": "{}"'.format(region) in l)), expected)
+        assert_equals(
+            [l.split(' ', 1)[1] for l in output_lines if l.split(' ', 1)[0] == region],
+            expected.getvalue().splitlines()
+        )
+    assert_equals(len(result.states), 3)
+
+def test_eviction():
+    """tests that a partition without transactions in the window is dropped and created again"""
+    lines = [_line(i, i % 4, i % 5 + 4, '"a"') for i in xrange(10)]
+    lines += [_line(10 + i, i % 3, i % 6 + 3, '"b"') for i in xrange(100)]
+    lines += [_line(110, 11, 12, '"a"'), _line(45, 1, 2, '"b"')]
+    output = StringIO()
+    result = partitions.main(StringIO(''.join(lines)), output, 'region', block_size=0,
+        MedianTrackerClass=FenwickMedianTracker)
+    output_lines = output.getvalue().splitlines()
+    assert_equals(result.evicted, 1)
+    # the partition is new, the late transaction is dropped
+    assert_equals(output_lines[-2:], ['a 1.00', 'b 1.00'])
+    # the users of the dropped partition are released
+    _, graph, _, _ = result.states['b']
+    assert_equals(len(result.interner), len(graph.graph) + 2)
+
+def test_lagging_feeds():
+    """tests that the medians of a partition lagging behind another by more than the window are the ones of a separate run"""
+    lines = []
+    for i in xrange(600):
+        # the eu feed is 5 minutes ahead of the us feed
+        lines.append(_line(300 + i / 2, (i * 7) % 9, (i * 5) % 13, '"eu"'))
+        lines.append(_line(i / 2, (i * 3) % 11, (i * 7) % 8, '"us"'))
+    output = StringIO()
+    result = partitions.main(StringIO(''.join(lines)), output, 'region', block_size=500)
+    output_lines = output.getvalue().splitlines()
+    assert_equals(len(output_lines), 1200)
+    for region in ['eu', 'us']:
+        expected = StringIO()
+        rolling_median.main(StringIO(''.join(l for l in lines if '"region": "{}"'.format(region) in l)), expected)
+        assert_equals(
+            [l.split(' ', 1)[1] for l in output_lines if l.split(' ', 1)[0] == region],
+            expected.getvalue().splitlines()
+        )
+    assert_equals(result.evicted, 0)
+
+def test_idle_lagging_feed():
+    """tests that a lagging partition idle while the clock moves a window forward starts again from an empty window"""
+    lines = [_line(0, 2, 1, '"us"'), _line(1, 3, 1, '"us"'), _line(300, 5, 4, '"eu"'), _line(400, 5, 6, '"eu"'),
+        _line(10, 3, 2, '"us"')]
+    output = StringIO()
+    result = partitions.main(StringIO(''.join(lines)), output, 'region', block_size=0)
+    assert_equals(result.evicted, 1)
+    # a separate run on the us feed has 2.00, the first two transactions are dropped with the partition
+    assert_equals(output.getvalue().splitlines()[-1], 'us 1.00')
+    expected = StringIO()
+    rolling_median.main(StringIO(''.join(l for l in lines if '"us"' in l)), expected)
+    assert_equals(expected.getvalue().splitlines()[-1], '2.00')
+
+def test_partition_memory():
+    """tests that only the partitions with transactions in the window are kept"""
+    partition_set = partitions.Partitions(window=10)
+    for i in xrange(1000):
+        partition_set.add(i, {'actor': 'a{}'.format(i), 'target': 'b{}'.format(i)}, i)
+        assert len(partition_set.states) <= 10
+    assert_equals(len(partition_set.interner), 20)
+    assert_equals(partition_set.evicted, 990)
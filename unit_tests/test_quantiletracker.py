@@ -0,0 +1,87 @@
+"""Tests for the QuantileTracker statistics.
+The statistics are compared with the ones computed from the sorted list of degrees.
+"""
+import random
+from StringIO import StringIO
+from nose.tools import assert_equals, assert_almost_equals, assert_raises
+from quantiletracker import QuantileTracker, QuantileTrackerException, check_statistic, parse_statistic
+from mediantracker import MedianTracker
+import rolling_median
+import tracker_util
+
+def _quantile(degree_list, q):
+    """linear interpolation between the closest ranks"""
+    degree_list = sorted(degree_list)
+    position = (len(degree_list) - 1) * q
+    rank = int(round(position, 9))
+    if rank + 1 == len(degree_list):
+        return degree_list[rank]
+    return degree_list[rank] + (position - rank) * (degree_list[rank + 1] - degree_list[rank])
+
+def _check(tracker, degree_list):
+    for q in [0, 0.1, 0.25, 0.5, 0.9, 0.99, 1]:
+        assert_almost_equals(tracker.quantile(q), _quantile(degree_list, q))
+    assert_equals(tracker.quantile(0.5), tracker.median())
+    assert_equals(tracker.statistic('min'), min(degree_list))
+    assert_equals(tracker.statistic('max'), max(degree_list))
+    mean = float(sum(degree_list)) / len(degree_list)
+    assert_almost_equals(tracker.statistic('mean'), mean)
+    assert_almost_equals(tracker.statistic('var'), sum((d - mean) ** 2 for d in degree_list) / len(degree_list))
+    assert_almost_equals(tracker.statistic('p90'), tracker.quantile(0.9))
+    assert_equals(parse_statistic('p99.9')(tracker), tracker.quantile(0.999))
+    assert_equals(parse_statistic('max')(tracker), max(degree_list))
+
+def test_statistics():
+    """tests single and batched updates against the sorted list of degrees"""
+    def exec_test(seed):
+        rand = random.Random(seed)
+        degree_list = [rand.randint(1, 30) for _ in xrange(rand.randint(1, 80))]
+        degrees = {}
+        for degree in degree_list:
+            degrees[degree] = degrees.get(degree, 0) + 1
+        tracker = QuantileTracker.from_degrees(degrees)
+        _check(tracker, degree_list)
+        for i in xrange(30):
+            updates = tracker_util.random_batch(rand, degree_list, rand.randint(0, 10))
+            if i % 2:
+                tracker.receive_batch(updates)
+            else:
+                for update in updates:
+                    tracker.receive(update)
+            if degree_list:
+                _check(tracker, degree_list)
+    for seed in xrange(10):
+        yield exec_test, seed
+
+def test_empty():
+    """tests that an empty tracker has the median of an empty MedianTracker, zero mean and zero variance"""
+    tracker = QuantileTracker()
+    assert_equals(tracker.quantile(0.9), MedianTracker().median())
+    assert_equals(tracker.mean(), 0)
+    assert_equals(tracker.variance(), 0)
+
+def test_check_statistic():
+    """tests that only percentiles from p0 to p100, min, max, mean and var are valid statistics"""
+    for name in ['p0', 'p90', 'p99.9', 'p100', 'min', 'max', 'mean', 'var']:
+        check_statistic(name)
+    for name in ['p', 'p101', 'median', '90', 'p9x']:
+        yield assert_raises, QuantileTrackerException, check_statistic, name
+        yield assert_raises, QuantileTrackerException, parse_statistic, name
+
+def test_rolling_median_columns():
+    """tests that the statistics are written after the median of each window"""
+    input_text = ''.join(
+        '{{"created_time": "2016-03-28T23:23:{:02d}Z", "target": "user-{}", "actor": "user-0"}}\n'.format(i, i + 1)
+        for i in xrange(4)
+    )
+    output = StringIO()
+    rolling_median.main(StringIO(input_text), output, MedianTrackerClass=QuantileTracker,
+        statistics=['max', 'mean'], windows=[60, 2])
+    assert_equals(output.getvalue().splitlines(), [
+        '1.00 1.00 1.00 1.00 1.00 1.00',
+        '1.00 2.00 1.33 1.00 2.00 1.33',
+        '1.00 3.00 1.50 1.00 2.00 1.33',
+        '1.00 4.00 1.60 1.00 2.00 1.33'
+    ])
+    assert_raises(QuantileTrackerException, rolling_median.main, StringIO(input_text), StringIO(),
+        statistics=['max'])
@@ -0,0 +1,116 @@
+"""Tests for the queries of the QueryServer.
+The server runs on a free localhost port for each test.
+"""
+import sys
+import json
+import socket
+import threading
+import urllib2
+from StringIO import StringIO
+from nose import with_setup
+from nose.tools import assert_equals
+import rolling_median
+from interner import NameInterner
+from mediantracker import MedianTracker
+from opsstorage import OpsStorage
+from queryserver import QueryServer
+from venmograph import VenmoGraph
+
+_globals = {}
+
+def setup_server():
+    interner = NameInterner()
+    stacks = [(OpsStorage(interner, window=window), VenmoGraph(), MedianTracker()) for window in (60, 1)]
+    for message in [
+        {'created_time': '2016-03-28T23:23:12Z', 'actor': 'Amber-Sauer', 'target': 'Raffi-Antilian'},
+        {'created_time': '2016-03-28T23:23:13Z', 'actor': 'Amber-Sauer', 'target': u'Caroline-K\xe4iser'},
+        {'created_time': '2016-03-28T23:23:14Z', 'actor': 'Amber-Sauer', 'target': 'Raffi-Antilian'}
+    ]:
+        for ops, graph, tracker in stacks:
+            new_messages, obsolete_messages = ops.get_update(message)
+            tracker.receive_batch(graph.update(new_messages, obsolete_messages))
+    _globals['server'] = QueryServer(0, threading.Lock(), stacks, interner)
+    _globals['server'].start()
+
+def teardown_server():
+    _globals['server'].stop()
+
+def _query(path, port=None):
+    url = 'http://127.0.0.1:{}{}'.format(port or _globals['server'].port, path)
+    try:
+        response = urllib2.urlopen(url)
+    except urllib2.HTTPError as e:
+        return e.code, json.load(e)
+    return response.getcode(), json.load(response)
+
+@with_setup(setup_server, teardown_server)
+def test_queries():
+    """tests the answers of each query"""
+    assert_equals(_query('/degree?user=Amber-Sauer'), (200, {'user': 'Amber-Sauer', 'degree': 2}))
+    assert_equals(_query('/degree?user=Amber-Sauer&window=1'), (200, {'user': 'Amber-Sauer', 'degree': 1}))
+    assert_equals(_query('/degree?user=nobody'), (200, {'user': 'nobody', 'degree': 0}))
+    assert_equals(_query('/neighbors?user=Amber-Sauer'), (200, {
+        'user': 'Amber-Sauer', 'neighbors': {'Raffi-Antilian': 2, u'Caroline-K\xe4iser': 1}
+    }))
+    assert_equals(_query('/degree?user=Caroline-K%C3%A4iser'), (200, {'user': u'Caroline-K\xe4iser', 'degree': 1}))
+    assert_equals(_query('/median'), (200, {'median': 1}))
+    assert_equals(_query('/histogram'), (200, {'histogram': {'1': 2, '2': 1}}))
+    assert_equals(_query('/degree')[0], 400)
+    assert_equals(_query('/median?window=5')[0], 400)
+    assert_equals(_query('/unknown')[0], 404)
+    status, metrics = _query('/metrics')
+    assert_equals(status, 200)
+    assert_equals(metrics['/degree']['count'], 4)
+    assert_equals(metrics['/median']['count'], 1)
+
+@with_setup(setup_server, teardown_server)
+def test_locked_state():
+    """tests that the queries wait while the state is locked"""
+    server = _globals['server']
+    result = []
+    with server.state_lock:
+        thread = threading.Thread(target=lambda: result.append(_query('/median')))
+        thread.start()
+        thread.join(0.2)
+        assert_equals(result, [])
+    thread.join()
+    assert_equals(result, [(200, {'median': 1})])
+
+class _QueryingInput(object):
+    """input stream sending a query before each block it returns"""
+    def __init__(self, text, port, path):
+        self.input = StringIO(text)
+        self.port = port
+        self.path = path
+        self.statuses = []
+
+    def read(self, size):
+        data = self.input.read(size)
+        if data:
+            self.statuses.append(_query(self.path, self.port)[0])
+        return data
+
+def test_invalid_encoding():
+    """tests that a user that isn't utf-8 is a bad request and that the output of rolling_median is unchanged"""
+    text = ''.join(
+        '{{"created_time": "2016-03-28T23:23:{:02d}Z", "target": "user-{}", "actor": "user-{}"}}\n'.format(
+            i, i % 5, (i * 3) % 7
+        ) for i in xrange(60)
+    )
+    expected = StringIO()
+    rolling_median.main(StringIO(text), expected)
+    # a free port
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    input_stream = _QueryingInput(text, port, '/degree?user=%ff')
+    stdout = sys.stdout
+    sys.stdout = output = StringIO()
+    try:
+        rolling_median.main(input_stream, sys.stdout, block_size=256, query_port=port)
+    finally:
+        sys.stdout = stdout
+    assert input_stream.statuses
+    assert_equals(set(input_stream.statuses), set([400]))
+    assert_equals(output.getvalue(), expected.getvalue())
@@ -0,0 +1,25 @@
+"""Tests for the output of rolling_median.
+"""
+from StringIO import StringIO
+from nose.tools import assert_equals
+import rolling_median
+from tracker_util import transaction_line
+
+_input = ''.join(
+    transaction_line(i, i % 13, (i * 5) % 17) for i in xrange(0, 600, 2)
+)
+
+def _run(**kwargs):
+    output = StringIO()
+    rolling_median.main(StringIO(_input), output, block_size=512, **kwargs)
+    return output.getvalue().splitlines()
+
+def test_output_columns():
+    """tests that the memoized medians of a single window are the same in every output mode"""
+    medians = _run()
+    assert_equals(len(medians), _input.count('\n'))
+    assert all(median == '{:.2f}'.format(float(median)) for median in medians)
+    assert_equals(_run(windows=(60, 60)), ['{} {}'.format(median, median) for median in medians])
+    debug_lines = _run(debug=True)
+    assert_equals([line.rsplit(' ', 1)[1] for line in debug_lines], medians)
+    assert all(line.startswith(input_line + ' ') for line, input_line in zip(debug_lines, _input.splitlines()))
@@ -0,0 +1,63 @@
+"""Tests for the run length encoding of the output.
+"""
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+from nose.tools import assert_equals, assert_raises
+import rolling_median
+import runlength
+from tracker_util import transaction_line
+
+_input = ''.join(
+    transaction_line(i, i % 5, (i * 3) % 7) for i in xrange(0, 600, 2)
+)
+
+def _decode(text):
+    output = StringIO()
+    runlength.decode(StringIO(text), output)
+    return output.getvalue()
+
+def test_encode():
+    """tests that the runs continue across calls to encode"""
+    encoder = runlength.RunLengthEncoder()
+    assert_equals(encoder.encode([]), '')
+    assert_equals(encoder.encode(['1.00\n', '1.00\n', '1.50\n']), '1.00 2\n')
+    assert_equals(encoder.encode(['1.50\n', '1 2\n']), '1.50 2\n')
+    assert_equals(encoder.flush(), '1 2 1\n')
+    assert_equals(encoder.flush(), '')
+    assert_equals(_decode('1.00 2\n1.50 2\n1 2 1\n'), '1.00\n1.00\n1.50\n1.50\n1 2\n')
+
+def test_decode_invalid():
+    """tests that runs without an output line or a positive count are rejected"""
+    for text in ['1.00\n', '1.00 x\n', '1.00 0\n', ' 3\n']:
+        assert_raises(runlength.RunLengthException, _decode, text)
+
+def test_merge_runs():
+    """tests that the runs of equal lines at the end of a text and the start of the next are merged"""
+    texts = ['1.00 2\n1.50 1\n', '1.50 3\n', '', '1.50 1\n2 1 2\n', '2 1 1\n3.00 1\n', '1.00 1\n']
+    assert_equals(''.join(runlength.merge_runs(texts)), '1.00 2\n1.50 5\n2 1 3\n3.00 1\n1.00 1\n')
+    assert_equals(list(runlength.merge_runs([])), [])
+
+def test_rolling_median_runs():
+    """tests that the decoded runs are the output of each line, also with checkpoints and several columns"""
+    for kwargs in [{}, {'windows': (60, 30)}, {'debug': True}]:
+        expected = StringIO()
+        rolling_median.main(StringIO(_input), expected, **kwargs)
+        runs = StringIO()
+        rolling_median.main(StringIO(_input), runs, block_size=256, runs=True, **kwargs)
+        assert len(runs.getvalue()) < len(expected.getvalue()) or kwargs.get('debug')
+        assert_equals(_decode(runs.getvalue()), expected.getvalue())
+    expected = StringIO()
+    rolling_median.main(StringIO(_input), expected)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'checkpoint')
+        runs = StringIO()
+        rolling_median.main(StringIO(_input[:len(_input) / 2]), runs, block_size=256, runs=True,
+            checkpoint_path=path, checkpoint_interval=10)
+        rolling_median.main(StringIO(_input), runs, block_size=256, runs=True,
+            checkpoint_path=path, checkpoint_interval=10)
+        assert_equals(_decode(runs.getvalue()), expected.getvalue())
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,80 @@
+"""Tests for the parallel processing of the time segments of a file.
+"""
+import tempfile
+from StringIO import StringIO
+from nose.tools import assert_equals, assert_raises
+import rolling_median
+import segments
+from quantiletracker import QuantileTracker
+
+def _line(seconds, target, actor):
+    return '{{"created_time": "2016-03-28T{:02d}:{:02d}:{:02d}Z", "target": "user-{}", "actor": "user-{}"}}\n'.format(
+        seconds / 3600, seconds / 60 % 60, seconds % 60, target, actor
+    )
+
+def _input():
+    """bursts of transactions separated by gaps longer than the window, with late and invalid lines"""
+    lines = []
+    start = 3600
+    for burst in xrange(12):
+        for i in xrange(40):
+            lines.append(_line(start + i * (burst % 3 + 1), (i * 7 + burst) % 9, (i * 5) % 11))
+            if i == 3:
+                # late in the window of the previous burst
+                lines.append(_line(start - 65, 1, 2))
+            if i == 10:
+                lines.append('not json\n')
+        start += 40 * (burst % 3 + 1) + (61 if burst % 2 else 200)
+    return ''.join(lines)
+
+def test_cut_points():
+    """tests that the cuts are after the gaps that clear the window, also when the input is scanned in blocks"""
+    text = _input()
+    scanned = [segments.scan_block(text, 0, len(text), 60)]
+    cuts = segments.cut_points(scanned, 60)
+    assert_equals(len(cuts), 11)
+    # the same cuts when the scan is split in blocks
+    ends = list(segments.find_line_ends(text, 0, 500))
+    assert_equals(ends[-1], len(text))
+    assert all(text[end - 1] == '\n' for end in ends)
+    scanned = [segments.scan_block(text, start, end, 60) for start, end in zip([0] + ends[:-1], ends)]
+    assert_equals(segments.cut_points(scanned, 60), cuts)
+    # a gap of 61 seconds does not clear a 120 seconds window
+    assert_equals(len(segments.cut_points(scanned, 120)), 6)
+    assert_equals(segments.split_segments(cuts, len(text), 1), [(0, len(text))])
+    assert_equals(segments.split_segments([], len(text), 4), [(0, len(text))])
+    bounds = segments.split_segments(cuts, len(text), 4)
+    assert_equals(len(bounds), 4)
+    assert all(start in cuts for start, _ in bounds[1:])
+
+def test_run_segments():
+    """tests that the concatenated output of the segments is the output of a single run, also with runs"""
+    text = _input()
+    with tempfile.TemporaryFile() as input_file:
+        input_file.write(text)
+        input_file.flush()
+        for kwargs in [{}, {'windows': (60, 120)},
+                {'statistics': ('p90', 'mean'), 'MedianTrackerClass': QuantileTracker, 'components': True},
+                {'runs': True}]:
+            expected = StringIO()
+            rolling_median.main(StringIO(text), expected, **kwargs)
+            output = StringIO()
+            count = segments.run_segments(input_file, output, 2, rolling_median.main, block_size=700, **kwargs)
+            assert count > 1
+            assert_equals(output.getvalue(), expected.getvalue())
+    # every median is 1.00, the runs of all the segments are merged in one
+    text = ''.join(_line(3600 + burst * 200 + i, i * 2, i * 2 + 1) for burst in xrange(8) for i in xrange(20))
+    with tempfile.TemporaryFile() as input_file:
+        input_file.write(text)
+        input_file.flush()
+        output = StringIO()
+        assert segments.run_segments(input_file, output, 2, rolling_median.main, block_size=700, runs=True) > 1
+        assert_equals(output.getvalue(), '1.00 160\n')
+
+def test_run_segments_invalid():
+    """tests that an empty file has no output and that an input without a file descriptor is rejected"""
+    with tempfile.TemporaryFile() as input_file:
+        output = StringIO()
+        assert_equals(segments.run_segments(input_file, output, 2, rolling_median.main), 0)
+        assert_equals(output.getvalue(), '')
+    assert_raises(segments.SegmentException, segments.run_segments, StringIO(''), StringIO(), 2, rolling_median.main)
@@ -0,0 +1,157 @@
+"""Tests for the streaming service.
+"""
+import os
+import time
+import shutil
+import socket
+import tempfile
+import threading
+from StringIO import StringIO
+from nose.tools import assert_equals
+import rolling_median
+import streamservice
+from mediantracker import MedianTracker
+from tracker_util import transaction_line
+
+_lines = [
+    transaction_line(i, i % 7, (i * 3) % 11) for i in xrange(0, 400, 2)
+]
+
+def _connect(address):
+    if isinstance(address, tuple):
+        return socket.create_connection(address)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(address)
+    return connection
+
+def _receive(connection, data):
+    while True:
+        chunk = connection.recv(4096)
+        if not chunk:
+            return
+        data.append(chunk)
+
+def _run_service(producer_address, subscriber_address, producer_lines, **kwargs):
+    """sends the lines of each producer, one after the other, and returns the output received by two subscribers"""
+    service = streamservice.StreamService(producer_address, subscriber_address, **kwargs)
+    service.start()
+    subscribers = [_connect(service.subscriber_address) for _ in xrange(2)]
+    while len(service.subscribers) < 2:
+        time.sleep(0.01)
+    outputs = [[], []]
+    receivers = [threading.Thread(target=_receive, args=(s, o)) for s, o in zip(subscribers, outputs)]
+    for thread in receivers:
+        thread.start()
+    total = 0
+    for lines in producer_lines:
+        producer = _connect(service.producer_address)
+        producer.sendall(''.join(lines))
+        producer.close()
+        # each line has an output line, the next producer starts after the lines of this one are processed
+        total += len(lines)
+        while any(''.join(output).count('\n') < total for output in outputs):
+            time.sleep(0.01)
+    service.stop()
+    for thread in receivers:
+        thread.join()
+    return [''.join(output) for output in outputs]
+
+def test_service():
+    """tests that the subscribers receive the output of rolling_median"""
+    expected = StringIO()
+    rolling_median.main(StringIO(''.join(_lines)), expected)
+    outputs = _run_service(0, 0, [_lines[:100], _lines[100:]], queue_size=16, block_size=256)
+    assert_equals(outputs, [expected.getvalue()] * 2)
+    directory = tempfile.mkdtemp()
+    try:
+        outputs = _run_service(os.path.join(directory, 'producers'), os.path.join(directory, 'subscribers'),
+            [_lines], windows=(60, 60))
+        assert_equals(outputs[0], ''.join('{} {}\n'.format(m, m) for m in expected.getvalue().split()))
+    finally:
+        shutil.rmtree(directory)
+
+def test_transaction_queue():
+    """tests that the producers wait while the queue is full and that the queued lines are read in order"""
+    transactions = streamservice.TransactionQueue(2)
+    assert transactions.put('a\n') and transactions.put('b\n')
+    producer = threading.Thread(target=transactions.put, args=('c\n',))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    assert_equals(transactions.read(3), 'a\nb\n')
+    producer.join()
+    transactions.close()
+    assert not transactions.put('d\n')
+    assert_equals(transactions.read(100), 'c\n')
+    assert_equals(transactions.read(100), '')
+
+def test_failed_reader():
+    """tests that the producers waiting on a full queue are released when its reader fails"""
+    transactions = streamservice.TransactionQueue(1)
+    assert transactions.put('a\n')
+    results = []
+    producer = threading.Thread(target=lambda: results.append(transactions.put('b\n')))
+    producer.start()
+    producer.join(0.2)
+    assert producer.is_alive()
+    transactions.fail()
+    producer.join(5)
+    assert not producer.is_alive()
+    assert_equals(results, [False])
+
+class _FailingTracker(MedianTracker):
+    """tracker raising after a few batches"""
+    batches = 0
+
+    def receive_batch(self, degree_updates):
+        self.batches += 1
+        if self.batches > 5:
+            raise ValueError('tracker failure')
+        MedianTracker.receive_batch(self, degree_updates)
+
+def _send(address, text):
+    producer = _connect(address)
+    try:
+        producer.sendall(text)
+    except socket.error:
+        # disconnected by the service
+        pass
+    finally:
+        producer.close()
+
+def test_failed_processing():
+    """tests that stop returns and re-raises the error of the processing, and that the producers are released"""
+    service = streamservice.StreamService(0, 0, queue_size=4, block_size=64, MedianTrackerClass=_FailingTracker)
+    service.start()
+    producers = [threading.Thread(target=_send, args=(service.producer_address, ''.join(_lines) * 50))
+        for _ in xrange(2)]
+    for thread in producers:
+        thread.start()
+    service.wait()
+    errors = []
+    def stop():
+        try:
+            service.stop()
+        except ValueError as e:
+            errors.append(e)
+    stopping = threading.Thread(target=stop)
+    stopping.start()
+    stopping.join(5)
+    assert not stopping.is_alive()
+    assert_equals([str(e) for e in errors], ['tracker failure'])
+    for thread in producers:
+        thread.join(5)
+        assert not thread.is_alive()
+
+def test_slow_subscriber():
+    """tests that a subscriber with a full queue is disconnected"""
+    subscribers = streamservice.Subscribers(2)
+    slow = subscribers.subscribe()
+    fast = subscribers.subscribe()
+    for text in ['1\n', '2\n', '3\n']:
+        subscribers.write(text)
+        fast.get()
+    assert_equals(len(subscribers), 1)
+    assert_equals(slow.get(), None)
+    subscribers.close()
+    assert_equals(fast.get(), None)
@@ -0,0 +1,74 @@
+"""Tests for the TopDegreeTracker, observer of the graph.
+The top nodes are compared with the degrees of all the nodes in the graph.
+"""
+import random
+import pickle
+from StringIO import StringIO
+from nose.tools import assert_equals, assert_raises
+from compactgraph import CompactVenmoGraph
+from topdegrees import TopDegreeTracker, TopDegreeException
+from venmograph import VenmoGraph
+import rolling_median
+from tracker_util import message
+
+def _check(top, graph):
+    nodes = top.top()
+    degrees = sorted((graph.degree(node) for node in graph.graph), reverse=True)
+    assert_equals([degree for _, degree in nodes], degrees[:top.k])
+    for node, degree in nodes:
+        assert_equals(graph.degree(node), degree)
+    assert_equals(len(set(node for node, _ in nodes)), len(nodes))
+
+def test_top():
+    """tests random updates, bulk evictions and a graph emptied at once"""
+    def exec_test(GraphClass, seed):
+        rand = random.Random(seed)
+        graph = GraphClass()
+        graph.BULK_EVICTION_SIZE = 3
+        graph.update([message(0, 1), message(2, 1)], [])
+        window = [message(0, 1), message(2, 1)]
+        top = TopDegreeTracker(3)
+        graph.add_observer(top)
+        _check(top, graph)
+        for i in xrange(400):
+            new_messages = [message(rand.randint(0, 5), rand.randint(6, 30))]
+            if i % 97 == 0:
+                obsolete_messages = window
+                window = []
+            else:
+                obsolete_messages = [window.pop(0) for _ in xrange(rand.randint(0, min(5, len(window))))]
+            window += new_messages
+            graph.update(new_messages, obsolete_messages)
+            _check(top, graph)
+    for GraphClass in (VenmoGraph, CompactVenmoGraph):
+        for seed in xrange(5):
+            yield exec_test, GraphClass, seed
+
+def test_invalid():
+    """tests that an invalid number of nodes and unknown degrees are rejected"""
+    assert_raises(TopDegreeException, TopDegreeTracker, 0)
+    top = TopDegreeTracker(2)
+    top.receive_degrees([('a', 0, 2)])
+    assert_raises(TopDegreeException, top.receive_degrees, [('a', 1, 0)])
+
+def test_observers_not_pickled():
+    """tests that the observers are not saved with the graph (eg in a checkpoint)"""
+    graph = VenmoGraph()
+    graph.add_observer(TopDegreeTracker(2))
+    graph.update([message('a', 'b')], [])
+    restored = pickle.loads(pickle.dumps(graph, pickle.HIGHEST_PROTOCOL))
+    assert_equals(restored.observers, [])
+    assert_equals(restored.graph, graph.graph)
+
+def test_rolling_median_column():
+    """tests the top users column of rolling_median"""
+    input_text = ''.join(
+        '{{"created_time": "2016-03-28T23:23:{:02d}Z", "target": "user-{}", "actor": "user-0"}}\n'.format(i, i % 2 + 1)
+        for i in xrange(3)
+    ) + '{"created_time": "2016-03-28T23:25:00Z", "target": "user-3", "actor": "user-4"}\n'
+    output = StringIO()
+    rolling_median.main(StringIO(input_text), output, top=1)
+    lines = output.getvalue().splitlines()
+    assert_equals(lines[:3], ['1.00 user-0:1', '1.00 user-0:2', '1.00 user-0:2'])
+    # the order of users with the same degree is arbitrary
+    assert lines[3] in ('1.00 user-3:1', '1.00 user-4:1'), lines[3]
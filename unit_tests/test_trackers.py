@@ -1,7 +1,10 @@
 """Tests for the MedianTracker operations.
 For the different types of updates a significant range of cases has been tested.
 """
+import random
+from nose.tools import assert_raises
 import tracker_util
+from mediantracker import MedianTracker, MedianTrackerException
 
 def test_compute_median():
     """test correct computation of the median
@@ -171,3 +174,85 @@ def test_receive_decrease_two_median():
     ]
     for test in degree_configuration_list:
         yield tracker_util.exec_simple_test, test
+
+def test_from_degrees():
+    """test that a tracker built from the degree counts has the same state
+    as the one generated from the list of degrees.
+    """
+    def exec_test(degree_list):
+        degrees = {}
+        for d in degree_list:
+            degrees[d] = degrees.get(d, 0) + 1
+        expected = tracker_util.generate_mediantracker(degree_list)
+        tracker = MedianTracker.from_degrees(degrees)
+        assert tracker.medians == expected.medians, '{} != {}'.format(
+            tracker.medians, expected.medians
+        )
+        assert tracker.nodes_linked_list == expected.nodes_linked_list
+        assert tracker.occupied_degrees == expected.occupied_degrees
+        assert tracker.median() == tracker_util.SimpleMedianTracker.from_degrees(degrees).median()
+    for degree_list in [[1], [1, 1], [1, 2, 3], [1, 1, 3, 5, 9], [1, 2, 3, 3, 5, 9], [2, 2, 2, 3, 5, 6, 7, 7, 11, 11]]:
+        yield exec_test, degree_list
+    assert MedianTracker.from_degrees({}).medians == MedianTracker().medians
+
+def test_receive_batch():
+    """test that a batch of updates leaves the tracker in the same state
+    as receiving the updates one at a time.
+    """
+    def exec_test(seed):
+        rand = random.Random(seed)
+        degree_list = [rand.randint(1, 12) for _ in xrange(rand.randint(0, 60))]
+        tracker = tracker_util.generate_mediantracker(sorted(degree_list))
+        expected = tracker_util.generate_mediantracker(sorted(degree_list))
+        for _ in xrange(20):
+            updates = tracker_util.random_batch(rand, degree_list, rand.randint(0, 40))
+            tracker.receive_batch(updates)
+            for update in updates:
+                expected.receive(update)
+            assert tracker.medians == expected.medians, '{} != {}'.format(
+                tracker.medians, expected.medians
+            )
+            assert tracker.degrees == expected.degrees
+            assert tracker.nodes_linked_list == expected.nodes_linked_list
+            assert tracker.occupied_degrees == expected.occupied_degrees == sorted(set(degree_list))
+    for seed in xrange(10):
+        yield exec_test, seed
+
+def test_receive_batch_empty():
+    """test a batch that removes all the nodes"""
+    tracker = tracker_util.generate_mediantracker([1, 1, 2, 3, 3, 3, 4, 5, 8, 9])
+    tracker.receive_batch([(1, 0), (1, 0), (2, 0), (3, 0), (3, 0), (3, 0), (4, 0), (5, 0), (8, 0), (9, 0)])
+    assert tracker.medians == MedianTracker().medians
+    assert tracker.nodes_linked_list == MedianTracker().nodes_linked_list
+    assert tracker.median() == float('inf')
+
+def test_receive_batch_invalid():
+    """test that invalid batches are rejected"""
+    tracker = tracker_util.generate_mediantracker([1, 2, 3])
+    valid = [(1, 0)] * (MedianTracker.BATCH_SIZE - 1)
+    for update in [(0, 2), (1, 3), (3, 5)]:
+        yield assert_raises, MedianTrackerException, tracker.receive_batch, valid + [update]
+    yield assert_raises, MedianTrackerException, tracker.receive_batch, [(2, 0)] * MedianTracker.BATCH_SIZE
+
+def test_receive_large_decrease():
+    """test decreases of a hub spanning many degrees, with and without nodes in between"""
+    def exec_test(degree_list, update):
+        tracker = tracker_util.generate_mediantracker(degree_list)
+        tracker.receive(update)
+        expected_list = list(degree_list)
+        expected_list.remove(update[0])
+        expected = tracker_util.generate_mediantracker(sorted(expected_list + [update[1]]))
+        assert tracker.medians == expected.medians, '{} != {}'.format(
+            tracker.medians, expected.medians
+        )
+        assert tracker.nodes_linked_list == expected.nodes_linked_list
+        assert tracker.occupied_degrees == expected.occupied_degrees
+    for test in [
+        ([1, 1, 2, 100000], (100000, 1)),
+        ([1, 1, 2, 100000], (100000, 3)),
+        ([1, 1, 2, 500, 100000], (100000, 499)),
+        ([1, 1, 2, 500, 100000], (100000, 500)),
+        ([1, 1, 2, 500, 100000], (100000, 501)),
+        ([3, 100000, 100000], (100000, 2))
+    ]:
+        yield exec_test, test[0], test[1]
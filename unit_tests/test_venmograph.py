@@ -3,7 +3,10 @@
 from nose import with_setup
 from nose.tools import assert_equals
 import copy
+import random
 import venmograph
+from mediantracker import MedianTracker
+from tracker_util import message
 
 _globals = {
     'single_edge_graph': {
@@ -210,3 +213,59 @@ def test_updates_on_generic_graph():
         },
         set([(2, 0), (2, 1), (1, 0)])
     )
+
+def test_all_obsolete():
+    """tests that the graph is emptied when all its transactions are obsolete"""
+    graph = venmograph.VenmoGraph()
+    window = [message('Amber-Sauer', 'Raffi-Antilian'), message('Amber-Sauer', 'Caroline-Kaiser-2'),
+        message('charlotte-macfarlane', 'Raffi-Antilian'), message('Amber-Sauer', 'Raffi-Antilian')]
+    for m in window:
+        graph.update([m], [])
+    assert_equals(graph.transaction_count, 4)
+    updates = graph.update([message('Amber-Sauer', 'Jamie-Korn')], window)
+    assert_equals(sorted(updates), [(0, 1), (1, 0), (1, 0), (2, 0), (2, 1)])
+    assert_equals(graph.graph, {'Amber-Sauer': {'Jamie-Korn': 1}, 'Jamie-Korn': {'Amber-Sauer': 1}})
+    assert_equals(graph.transaction_count, 1)
+
+def test_reset_on_clear():
+    """tests that a tracker cleared when the graph is emptied has the median of one receiving every update"""
+    graph = venmograph.VenmoGraph()
+    tracker = MedianTracker()
+    reset_graph = venmograph.VenmoGraph()
+    reset_tracker = MedianTracker()
+    reset_graph.reset_on_clear(reset_tracker)
+    rand = random.Random(0)
+    window = []
+    for i in xrange(300):
+        new_messages = [message(rand.randint(0, 5), rand.randint(0, 10))]
+        if i % 50 == 49:
+            obsolete_messages = window
+            window = []
+        else:
+            obsolete_messages = [window.pop(0) for _ in xrange(rand.randint(0, max(0, min(3, len(window) - 1))))]
+        window += new_messages
+        tracker.receive_batch(graph.update(new_messages, obsolete_messages))
+        updates = reset_graph.update(new_messages, obsolete_messages)
+        if i % 50 == 49:
+            assert all(before == 0 for before, _ in updates)
+        reset_tracker.receive_batch(updates)
+        assert_equals(reset_tracker.median(), tracker.median())
+        assert_equals(reset_graph.graph, graph.graph)
+
+def test_bulk_obsolete():
+    """tests that counting the obsolete messages by pair gives the same updates"""
+    def exec_test(seed):
+        rand = random.Random(seed)
+        graph = venmograph.VenmoGraph()
+        bulk = venmograph.VenmoGraph()
+        bulk.BULK_EVICTION_SIZE = 2
+        window = []
+        for _ in xrange(300):
+            new_messages = [message(rand.randint(0, 5), rand.randint(0, 10))]
+            obsolete_messages = [window.pop(0) for _ in xrange(rand.randint(0, max(0, min(6, len(window) - 1))))]
+            window += new_messages
+            expected = graph.update(new_messages, obsolete_messages)
+            assert_equals(sorted(bulk.update(new_messages, obsolete_messages)), sorted(expected))
+            assert_equals(bulk.graph, graph.graph)
+    for seed in xrange(5):
+        yield exec_test, seed
@@ -1,4 +1,4 @@
-"""This module provides utilities for generating tracker unit tests"""
+"""This module provides utilities for generating tracker unit tests and their input"""
 if __name__ == '__main__':
     import sys, os
     basepath = os.path.dirname(os.path.abspath(__file__))
@@ -43,6 +43,7 @@ def generate_mediantracker(degree_list):
     tracker.degrees = degrees
     tracker.nodes_linked_list = linked_list
     tracker.medians = tuple(medians)
+    tracker.occupied_degrees = sorted(set(degree_list))
     return tracker
 
 def exec_simple_test(test):
@@ -95,10 +96,23 @@ class SimpleMedianTracker(MedianTracker):
         self.degrees = {}
         self._receive_decrease = self._receive_increase
 
+    @classmethod
+    def from_degrees(cls, degrees):
+        tracker = cls()
+        for degree in sorted(degrees):
+            if 0 < degree < float('inf'):
+                tracker.degree_list += [degree] * degrees[degree]
+                tracker.degrees[degree] = degrees[degree]
+        return tracker
+
     def receive(self, update):
         # print self.degree_list, update
         super(SimpleMedianTracker, self).receive(update)
 
+    def receive_batch(self, updates):
+        for update in updates:
+            self.receive(update)
+
     def _receive_new(self):
         self.degree_list.insert(0, 1)
         self.degrees[1] = self.degrees.get(1, 0) + 1
@@ -121,7 +135,7 @@ class SimpleMedianTracker(MedianTracker):
                 self.degree_list.insert(i, degree_after)
                 break
         else:
-            self.degree_list.insert(i + 1, degree_after)
+            self.degree_list.append(degree_after)
 
     def median(self):
         m = len(self.degree_list)/2
@@ -131,6 +145,42 @@ class SimpleMedianTracker(MedianTracker):
             return self.degree_list[m]
 
 
+def random_batch(rand, degree_list, count):
+    """generates a batch of degree updates as the ones of a single transaction:
+    at most one update for each node of degree_list, that is updated, and a few new nodes.
+    """
+    updates = []
+    for i in rand.sample(xrange(len(degree_list)), min(count, len(degree_list))):
+        degree = degree_list[i]
+        r = rand.random()
+        if r < 0.4:
+            degree_list[i] = 0
+        elif r < 0.6 or degree == 1:
+            degree_list[i] = degree + 1
+        else:
+            degree_list[i] = rand.randint(1, degree - 1)
+        updates.append((degree, degree_list[i]))
+    for _ in xrange(rand.randint(0, 2)):
+        degree_list.append(1)
+        updates.append((0, 1))
+    degree_list[:] = [d for d in degree_list if d]
+    return updates
+
+
+def transaction_line(seconds, target, actor):
+    """generates the json line of a transaction from user-<actor> to user-<target>,
+    created the given seconds after 2016-03-28T23:23:00Z.
+    """
+    return '{{"created_time": "2016-03-28T23:{:02d}:{:02d}Z", "target": "user-{}", "actor": "user-{}"}}\n'.format(
+        23 + seconds / 60, seconds % 60, target, actor
+    )
+
+
+def message(actor, target):
+    """generates a decoded transaction between actor and target at a fixed time"""
+    return {'created_time': '2016-03-28T23:23:12Z', 'actor': actor, 'target': target}
+
+
 if __name__ == '__main__':
     if len(sys.argv) == 2:
         debug = (sys.argv[1] == 'debug')